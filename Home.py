@@ -4,27 +4,30 @@ import pandas as pd
 import os
 from uuid import uuid4
 from authlib.integrations.requests_client import OAuth2Session
-import base64
-from pathlib import Path
-from helpers import hide_sidebar, remove_st_branding, apply_header_font, render_logo, verify_microsoft_id_token, get_authenticated_supabase
-
-# ---------------------------------------------
-# Icon loading
-# ---------------------------------------------
-
-BASE_DIR = Path(__file__).resolve().parent
-ASSETS_DIR = BASE_DIR / "assets"
-ICON_PATH = ASSETS_DIR / "page_icon.png"
+from db import begin_query_run
+from helpers import hide_sidebar, remove_st_branding, apply_header_font, render_logo, resolve_auth_context, get_authenticated_supabase, get_page_icon, get_background_image_url, start_warm_up, wait_for_warm_up
 
 # ---------------------------------------------
 # Page Setup
 # ---------------------------------------------
 
-st.set_page_config(page_icon= ICON_PATH, layout="wide")
+begin_query_run("Home")
+start_warm_up()
+st.set_page_config(page_icon=get_page_icon(), layout="wide")
 remove_st_branding()
 hide_sidebar()
 apply_header_font()
 
+# Keep-awake check used by runner.py: ?warmup waits for the cache warm-up and reports the result
+if "warmup" in st.query_params:
+    warm_up_report = wait_for_warm_up()
+    if warm_up_report is None:
+        st.write("Warm-up timed out")
+    else:
+        failed = [step for step, result in warm_up_report.items() if isinstance(result, str)]
+        st.write(f"Warm-up failed: {', '.join(failed)}" if failed else "Warm-up complete")
+    st.stop()
+
 st.markdown(
     """
     <style>
@@ -112,35 +115,21 @@ token = st.session_state["token"]
 
 if token and "id_token" in token:
 
-    # Decode Microsoft ID Token
+    # Verify the Microsoft ID token
     try:
-        decoded = verify_microsoft_id_token(token["id_token"])
+        auth = resolve_auth_context()
     except Exception:
+        auth = None
+
+    if auth is None:
         st.error("Invalid login session. Please sign in again.")
         st.session_state.clear()
         st.stop()
 
-    # Extract name + email from v1 token
-    user_name_raw = decoded.get("name", "Unknown User")
-    user_email = (
-        decoded.get("preferred_username")
-        or decoded.get("email")
-        or decoded.get("upn")
-        or decoded.get("unique_name")
-        or ""
-    )
-
-    # Format full name
-    if "," in user_name_raw:
-        last, first = [x.strip() for x in user_name_raw.split(",", 1)]
-        user_name = f"{first} {last}"
-    else:
-        user_name = user_name_raw.strip()
-
-    st.session_state["user_name"] = user_name
-    st.session_state["user_email"] = user_email
+    user_name = auth.user_name
+    user_email = auth.user_email
 
-    st.set_page_config(page_title="Home", page_icon= ICON_PATH, layout="wide")
+    st.set_page_config(page_title="Home", page_icon=get_page_icon(), layout="wide")
 
     # ---- Session bootstrap ----
     st.session_state.setdefault("SessionID", str(uuid4()))
@@ -331,14 +320,8 @@ else:
         resource=CLIENT_ID,
     )
 
-    # Get image
-    BASE_DIR = Path(__file__).resolve().parent
-    ASSETS_DIR = BASE_DIR / "assets"
-    LOGO_PATH = ASSETS_DIR / "WWTW_2025.jpg"
-
-    # Convert image to base64
-    with open(LOGO_PATH, "rb") as img_file:
-        encoded = base64.b64encode(img_file.read()).decode()
+    bg_url = get_background_image_url()
+    bg_layer = f', url("{bg_url}")' if bg_url else ""
 
     st.markdown(
         f"""
@@ -350,8 +333,7 @@ else:
 
         .stApp {{
             background-image:
-                linear-gradient(rgba(0,0,0,0.4), rgba(0,0,0,0.4)),
-                url("data:image/jpg;base64,{encoded}");
+                linear-gradient(rgba(0,0,0,0.4), rgba(0,0,0,0.4)){bg_layer};
             background-size: cover;
             background-position: center;
             background-repeat: no-repeat;
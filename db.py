@@ -1,26 +1,278 @@
 # db.py
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
 import httpx
 from supabase import create_client, ClientOptions
 import streamlit as st
 
-def get_supabase():
+# Shared connection pool sizing - one pool serves every session in the process
+POOL_LIMITS = httpx.Limits(
+    max_connections=50,
+    max_keepalive_connections=20,
+    keepalive_expiry=60.0,
+)
+POOL_TIMEOUT = httpx.Timeout(20.0, connect=5.0)
+
+
+@st.cache_resource(show_spinner=False)
+def get_http_pool() -> httpx.Client:
+    """Process-wide keep-alive HTTP client shared by all Supabase clients.
+
+    Auth headers are sent per request by each Supabase client, so sharing the
+    transport between sessions is safe and saves a TCP+TLS handshake per rerun.
+    """
+    return httpx.Client(
+        verify=True,
+        http2=True,
+        follow_redirects=True,
+        limits=POOL_LIMITS,
+        timeout=POOL_TIMEOUT,
+    )
+
+
+# -------------------------------------------------------------------
+# Query instrumentation: per-run query log + slow-query log file
+# -------------------------------------------------------------------
+BASE_DIR = Path(__file__).resolve().parent
+
+SLOW_QUERY_SECONDS = float(os.environ.get("SLOW_QUERY_SECONDS", "0.5"))
+SLOW_QUERY_LOG = Path(os.environ.get("SLOW_QUERY_LOG") or BASE_DIR / "logs" / "slow_queries.log")
+QUERY_LOG_KEY = "query_log"
+
+# Builder calls recorded as the query's "filters" (the statement itself is the action)
+_STATEMENTS = {"select", "insert", "update", "upsert", "delete"}
+
+# Builder calls whose first argument is a column name. Filters are recorded as
+# method + column only (e.g. "eq(employee_email)"): the values can be personal
+# data and end up in the slow-query log and the admin query panel.
+_COLUMN_CALLS = {
+    "eq", "neq", "gt", "gte", "lt", "lte", "like", "ilike", "is_", "in_",
+    "contains", "contained_by", "filter", "order",
+}
+
+
+def _describe_call(name: str, args: tuple) -> str:
+    if name in _COLUMN_CALLS and args and isinstance(args[0], str):
+        return f"{name}({args[0]})"
+    if name == "match" and args and isinstance(args[0], dict):
+        return f"{name}({', '.join(map(str, args[0]))})"
+    return f"{name}()"
+
+
+@dataclass
+class QueryRecord:
+    table: str
+    action: str
+    filters: list
+    rows: int
+    bytes: int
+    seconds: float
+    error: str | None = None
+
+
+@dataclass
+class QueryRunLog:
+    """Queries made by one script run of one page."""
+    page: str
+    started: float = field(default_factory=time.time)
+    records: list = field(default_factory=list)
+    measure_bytes: bool = False   # payload sizes cost a serialisation, so only when shown
+
+    def summary(self) -> dict:
+        return {
+            "queries": len(self.records),
+            "seconds": sum(r.seconds for r in self.records),
+            "rows": sum(r.rows for r in self.records),
+            "bytes": sum(r.bytes for r in self.records),
+        }
+
+
+@st.cache_resource(show_spinner=False)
+def get_slow_query_logger() -> logging.Logger:
+    logger = logging.getLogger("wwtw.slow_queries")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    try:
+        SLOW_QUERY_LOG.parent.mkdir(parents=True, exist_ok=True)
+        handler = logging.FileHandler(SLOW_QUERY_LOG, encoding="utf-8")
+    except OSError:
+        handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    logger.addHandler(handler)
+    return logger
+
+
+def begin_query_run(page: str, measure_bytes: bool = False):
+    """Start a fresh query log for this session's current script run."""
+    try:
+        st.session_state[QUERY_LOG_KEY] = QueryRunLog(page=page, measure_bytes=measure_bytes)
+    except Exception:
+        pass
+
+
+def get_query_run() -> QueryRunLog | None:
+    try:
+        return st.session_state.get(QUERY_LOG_KEY)
+    except Exception:
+        return None
+
+
+def _measuring_bytes() -> bool:
+    run = get_query_run()
+    return run is not None and run.measure_bytes
+
+
+def _record_query(record: QueryRecord):
+    run = get_query_run()
+    if run is not None:
+        run.records.append(record)
+
+    if record.seconds >= SLOW_QUERY_SECONDS or record.error:
+        get_slow_query_logger().info(json.dumps({
+            "page": run.page if run is not None else None,
+            "table": record.table,
+            "action": record.action,
+            "filters": record.filters,
+            "rows": record.rows,
+            "bytes": record.bytes,
+            "ms": round(record.seconds * 1000, 1),
+            "error": record.error,
+        }, default=str))
+
+
+# -------------------------------------------------------------------
+# Data version: bumped by every write made through this process's clients
+# -------------------------------------------------------------------
+class DataVersion:
+    """Process-wide write counter; caches keyed on it are invalidated by any write."""
+
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    def bump(self) -> int:
+        with self._lock:
+            self._value += 1
+            return self._value
+
+
+@st.cache_resource(show_spinner=False)
+def _get_data_version() -> DataVersion:
+    return DataVersion()
+
+
+def get_data_version() -> int:
+    return _get_data_version().value
+
+
+def bump_data_version() -> int:
+    return _get_data_version().bump()
+
+
+class InstrumentedQuery:
+    """Wraps a postgrest builder; records filters and times execute()."""
+
+    def __init__(self, builder, table: str, action: str = "select"):
+        self._builder = builder
+        self._table = table
+        self._action = action
+        self._filters = []
+
+    def __getattr__(self, name):
+        attr = getattr(self._builder, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            if name in _STATEMENTS:
+                self._action = name
+            else:
+                self._filters.append(_describe_call(name, args))
+            if result is None or result is self._builder:
+                return self
+            self._builder = result
+            return self
+
+        return call
+
+    def execute(self):
+        start = time.perf_counter()
+        try:
+            res = self._builder.execute()
+        except Exception as e:
+            _record_query(QueryRecord(
+                self._table, self._action, self._filters, 0, 0,
+                time.perf_counter() - start, error=str(e),
+            ))
+            raise
+        elapsed = time.perf_counter() - start
+
+        data = getattr(res, "data", None)
+        rows = len(data) if isinstance(data, list) else int(data is not None)
+        # Re-serialising is O(rows): only for the slow-query log or a visible query log panel
+        size = 0
+        if data is not None and (elapsed >= SLOW_QUERY_SECONDS or _measuring_bytes()):
+            size = len(json.dumps(data, default=str))
+        _record_query(QueryRecord(self._table, self._action, self._filters, rows, size, elapsed))
+        if self._action != "select":
+            bump_data_version()
+        return res
+
+
+class InstrumentedClient:
+    """Supabase (or local_db) client whose table/rpc queries are recorded."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def table(self, name: str):
+        return InstrumentedQuery(self._client.table(name), name)
+
+    from_ = table
+
+    def rpc(self, name: str, params=None, **kwargs):
+        return InstrumentedQuery(self._client.rpc(name, params, **kwargs), name, "rpc")
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def get_backend() -> str:
+    """Return "supabase" (default) or "local" for the in-memory stand-in in local_db.py."""
+    backend = os.environ.get("SUPABASE_BACKEND") or st.secrets.get("supabase", {}).get("BACKEND")
+    return (backend or "supabase").strip().lower()
+
+
+def get_supabase(auto_refresh_token=True):
+    if get_backend() == "local":
+        from local_db import create_local_client
+        return InstrumentedClient(create_local_client())
+
     url = st.secrets["supabase"]["SUPABASE_URL"]
     key = st.secrets["supabase"]["SUPABASE_KEY"]
 
     if not url or not key:
         raise RuntimeError("SUPABASE_URL or SUPABASE_KEY not set in secrets.toml")
 
-    # Disable SSL verification TEMPORARILY - TODO: Change this to be verify=True
     # TODO: Add RLS policies in Supabase dashboard
-    insecure_client = httpx.Client(verify=True)
-
     options = ClientOptions(
-        auto_refresh_token=True,
+        auto_refresh_token=auto_refresh_token,
         persist_session=False,
-        httpx_client=insecure_client,  # Patch here
+        httpx_client=get_http_pool(),
     )
 
-    return create_client(url, key, options)
+    return InstrumentedClient(create_client(url, key, options))
 
 # Create reusable singleton client
-supabase = get_supabase()
\ No newline at end of file
+supabase = get_supabase()
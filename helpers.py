@@ -1,20 +1,32 @@
 from pathlib import Path
+from dataclasses import dataclass, field
 import streamlit as st
 import pandas as pd
 import numpy as np
 import base64
+import hashlib
 import jwt
+import folium
 from PIL import Image
 from io import BytesIO
 from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from db import get_supabase
+from openpyxl.styles import Font, Alignment, PatternFill, Border, Side, NamedStyle
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
+from db import get_supabase, begin_query_run, get_query_run, get_data_version, SLOW_QUERY_SECONDS, POOL_TIMEOUT
 import xml.etree.ElementTree as ET
 from streamlit.components.v1 import html as st_html
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from streamlit.runtime.scriptrunner_utils.script_requests import ScriptRequestType
 import math
 import os
 import re
+import threading
+import time
 import unicodedata
+from collections import OrderedDict, deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
 from jwt import PyJWKClient
 
 
@@ -28,22 +40,61 @@ LOGO_PATH = ASSETS_DIR / "logo.png"
 ICON_PATH = ASSETS_DIR / "page_icon.png"
 HEADER_FONT_PATH = ASSETS_DIR / "GT-Standard-L-Extended-Medium.otf"
 
+# Files copied here are served by Streamlit at app/static/<name>
+# (requires server.enableStaticServing in .streamlit/config.toml)
+STATIC_DIR = BASE_DIR / "static"
+STATIC_URL_PREFIX = "app/static"
 
-def apply_header_font():
-    if not HEADER_FONT_PATH.exists():
-        return
 
+def static_serving_enabled() -> bool:
     try:
-        font_b64 = base64.b64encode(HEADER_FONT_PATH.read_bytes()).decode("utf-8")
+        return bool(st.get_option("server.enableStaticServing"))
     except Exception:
-        return
+        return False
+
+
+def publish_static_asset(name: str, data: bytes) -> str | None:
+    """Write `data` to static/<name> (if changed) and return its URL; None if static serving is off."""
+    if not static_serving_enabled():
+        return None
+    try:
+        target = STATIC_DIR / name
+        if not target.exists() or target.read_bytes() != data:
+            STATIC_DIR.mkdir(exist_ok=True)
+            target.write_bytes(data)
+        return f"{STATIC_URL_PREFIX}/{name}"
+    except OSError:
+        return None
 
-    st.markdown(
-        f"""
+
+@st.cache_resource(show_spinner=False)
+def _header_font_b64() -> str | None:
+    if not HEADER_FONT_PATH.exists():
+        return None
+    try:
+        return base64.b64encode(HEADER_FONT_PATH.read_bytes()).decode("utf-8")
+    except Exception:
+        return None
+
+
+@st.cache_resource(show_spinner=False)
+def _header_font_css(serve_static: bool) -> str | None:
+    """Build the header @font-face CSS once - as a static file URL or an inline data URI."""
+    font_url = None
+    if serve_static and HEADER_FONT_PATH.exists():
+        font_url = publish_static_asset(HEADER_FONT_PATH.name, HEADER_FONT_PATH.read_bytes())
+
+    if font_url is None:
+        font_b64 = _header_font_b64()
+        if not font_b64:
+            return None
+        font_url = f"data:font/otf;base64,{font_b64}"
+
+    return f"""
         <style>
         @font-face {{
             font-family: 'GTStandardHeader';
-            src: url(data:font/otf;base64,{font_b64}) format('opentype');
+            src: url({font_url}) format('opentype');
             font-weight: 500;
             font-style: normal;
         }}
@@ -59,16 +110,111 @@ def apply_header_font():
             font-family: 'GTStandardHeader', sans-serif !important;
         }}
         </style>
-        """,
-        unsafe_allow_html=True,
-    )
+        """
+
+
+def apply_header_font(serve_static: bool | None = None):
+    """
+    Inject the header font CSS. serve_static=None serves the font from app/static
+    when static serving is enabled, otherwise inlines it as base64.
+    """
+    if serve_static is None:
+        serve_static = static_serving_enabled()
+
+    css = _header_font_css(serve_static)
+    if css:
+        st.markdown(css, unsafe_allow_html=True)
+
+
+# -------------------------------------------------------------------
+# Image Assets: decoded once, resized + re-encoded variants
+# -------------------------------------------------------------------
+BACKGROUND_IMAGE_PATH = ASSETS_DIR / "WWTW_2025.jpg"
+
+LOGO_MAX_HEIGHT = 96         # st.logo "large" is 32px high - 3x for high-DPI screens
+ICON_MAX_HEIGHT = 128
+BACKGROUND_MAX_WIDTH = 1920
+
+
+def _asset_mtime(path: Path) -> float | None:
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return None
+
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def _load_image_cached(path: str, mtime: float, max_width: int | None, max_height: int | None) -> Image.Image:
+    with Image.open(path) as img:
+        img.load()
+        img = img.copy()
+    if max_width or max_height:
+        img.thumbnail((max_width or img.width, max_height or img.height), Image.LANCZOS)
+    return img
+
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def _image_url_cached(path: str, mtime: float, max_width: int | None, max_height: int | None,
+                      fmt: str, quality: int, serve_static: bool) -> str:
+    img = _load_image_cached(path, mtime, max_width, max_height)
+    if fmt == "JPEG" and img.mode != "RGB":
+        img = img.convert("RGB")
+
+    buffer = BytesIO()
+    img.save(buffer, format=fmt, quality=quality)
+    data = buffer.getvalue()
+
+    if serve_static:
+        name = f"{Path(path).stem}-{max_width or 0}x{max_height or 0}.{fmt.lower()}"
+        url = publish_static_asset(name, data)
+        if url:
+            return url
+
+    return f"data:image/{fmt.lower()};base64,{base64.b64encode(data).decode('utf-8')}"
+
+
+def image_url(path, max_width: int | None = None, max_height: int | None = None,
+              fmt: str = "WEBP", quality: int = 80) -> str | None:
+    """
+    URL for a resized, re-encoded copy of an image asset (built once per process):
+    app/static/... when static serving is enabled, otherwise a data URI.
+    """
+    path = _resolve_asset_path(path)
+    mtime = _asset_mtime(path)
+    if mtime is None:
+        return None
+    return _image_url_cached(str(path), mtime, max_width, max_height, fmt, quality, static_serving_enabled())
+
+
+def _element_image_url(url: str | None) -> str | None:
+    """
+    image_url() for st.logo / page_icon. Streamlit passes URLs to these through
+    as-is (a PIL image would be re-encoded on every rerun), but only treats
+    static URLs as such when they start with "/app/static/".
+    """
+    if url and url.startswith(f"{STATIC_URL_PREFIX}/"):
+        return f"/{url}"
+    return url
+
+
+def get_page_icon() -> str | None:
+    return _element_image_url(image_url(ICON_PATH, max_height=ICON_MAX_HEIGHT, fmt="PNG"))
+
+
+def get_logo_url() -> str | None:
+    return _element_image_url(image_url(LOGO_PATH, max_height=LOGO_MAX_HEIGHT))
+
+
+def get_background_image_url() -> str | None:
+    """Full-screen background used by the login and Thanks pages, resized and encoded once per process."""
+    return image_url(BACKGROUND_IMAGE_PATH, max_width=BACKGROUND_MAX_WIDTH, quality=75)
 
 
 def render_logo(logo_link: str = "https://dxc.com/uk/en"):
     st.logo(
-        Image.open(LOGO_PATH),
+        get_logo_url(),
         link=logo_link,
-        icon_image=Image.open(ICON_PATH),
+        icon_image=get_page_icon(),
         size="large"
     )
 
@@ -77,15 +223,61 @@ def render_logo(logo_link: str = "https://dxc.com/uk/en"):
 # Page Setup
 # -------------------------------------------------------------------
 def init_page(page_title: str, layout: str = "wide", logo_link: str = "https://dxc.com/uk/en"):
+    begin_query_run(page_title, measure_bytes=section_is_open(QUERY_LOG_SECTION))
+    start_warm_up()
     st.set_page_config(
         page_title=page_title,
-        page_icon=Image.open(ICON_PATH),
+        page_icon=get_page_icon(),
         layout=layout
     )
     apply_header_font()
     render_logo(logo_link=logo_link)
     st.title(page_title)
 
+# -------------------------------------------------------------------
+# Query Log Panel (admins)
+# -------------------------------------------------------------------
+QUERY_LOG_SECTION = "query_log"
+
+
+def render_query_log_panel():
+    """Summarise the Supabase queries this script run made (call at the end of a page)."""
+    run = get_query_run()
+    if run is None:
+        return
+
+    summary = run.summary()
+    # Stable label: the timings change every run, which would reset the toggle
+    panel = lazy_expander("Query log", QUERY_LOG_SECTION)
+    with panel:
+        if not panel.open:
+            return
+
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("Queries", summary["queries"])
+        c2.metric("Total time", f"{summary['seconds'] * 1000:.0f} ms")
+        c3.metric("Rows", summary["rows"])
+        c4.metric("Payload", f"{summary['bytes'] / 1024:.1f} KB")
+
+        if run.records:
+            st.dataframe(
+                pd.DataFrame([
+                    {
+                        "Table": r.table,
+                        "Action": r.action,
+                        "Filters": ", ".join(r.filters),
+                        "Rows": r.rows,
+                        "Bytes": r.bytes,
+                        "ms": round(r.seconds * 1000, 1),
+                        "Error": r.error or "",
+                    }
+                    for r in run.records
+                ]),
+                hide_index=True,
+                width="stretch",
+            )
+        st.caption(f"Queries slower than {SLOW_QUERY_SECONDS * 1000:.0f} ms are also written to the slow-query log.")
+
 # -------------------------------------------------------------------
 # Page Setup
 # -------------------------------------------------------------------
@@ -99,16 +291,32 @@ def hide_sidebar():
 # -------------------------------------------------------------------
 # Access Control
 # -------------------------------------------------------------------
-def require_access(user_key="user_emails", admin_key="admin_emails"):
+def _access_flags(user_email: str, user_key="user_emails", admin_key="admin_emails"):
+    """(is_authorised, is_admin) for an email against the access_control lists."""
     access = st.secrets.get("access_control", {})
-    user_email = st.session_state.get("user_email", "").lower()
-    user_name = st.session_state.get("user_name", "").strip()
+    user_email = (user_email or "").lower()
 
     allowed_users = {e.lower() for e in access.get(user_key, [])}
     admins = {e.lower() for e in access.get(admin_key, [])}
 
     is_admin = user_email in admins
-    is_authorised = user_email in allowed_users or is_admin
+    return user_email in allowed_users or is_admin, is_admin
+
+
+def require_access(user_key="user_emails", admin_key="admin_emails"):
+    user_email = st.session_state.get("user_email", "").lower()
+    user_name = st.session_state.get("user_name", "").strip()
+
+    # The session's AuthContext already resolved the default lists at login
+    auth = st.session_state.get(AUTH_CONTEXT_KEY)
+    if (
+        auth is not None
+        and auth.email_key == user_email
+        and (user_key, admin_key) == ("user_emails", "admin_emails")
+    ):
+        is_authorised, is_admin = auth.is_authorised, auth.is_admin
+    else:
+        is_authorised, is_admin = _access_flags(user_email, user_key, admin_key)
 
     if not is_authorised:
         st.write("---")
@@ -123,6 +331,73 @@ def require_access(user_key="user_emails", admin_key="admin_emails"):
 # -------------------------------------------------------------------
 # Authenticated Supabase client
 # -------------------------------------------------------------------
+SUPABASE_AUTH_KEY = "supabase_auth"
+SESSION_REFRESH_MARGIN = 300   # refresh in the background this long before expiry
+SESSION_EXPIRY_MARGIN = 30     # closer than this, refresh inline before using the client
+
+
+class SupabaseSession:
+    """
+    One user's signed-in Supabase client and the expiry of its access token.
+
+    The token is refreshed on a background thread once it is within
+    SESSION_REFRESH_MARGIN of expiry, and concurrent refreshes share one
+    request. A normal rerun makes no auth calls at all.
+    """
+
+    def __init__(self, client, session):
+        self.client = client
+        self._refresh_lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._refresh_thread = None
+        self.last_error = None
+        self._store(session)
+
+    def _store(self, session):
+        self.access_token = session.access_token
+        self.refresh_token = session.refresh_token
+        self.expires_at = session.expires_at or (time.time() + (session.expires_in or 3600))
+
+    def seconds_left(self) -> float:
+        return self.expires_at - time.time()
+
+    def refresh(self):
+        # Whoever gets the lock first refreshes; the rest find a fresh token
+        with self._refresh_lock:
+            if self.seconds_left() > SESSION_REFRESH_MARGIN:
+                return
+            try:
+                # Also fires TOKEN_REFRESHED, which swaps the client's auth header
+                self._store(self.client.auth.refresh_session(self.refresh_token).session)
+                self.last_error = None
+            except Exception as e:
+                self.last_error = e
+
+    def _refresh_in_background(self):
+        with self._thread_lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return
+            self._refresh_thread = threading.Thread(
+                target=self.refresh, name="supabase-session-refresh", daemon=True
+            )
+            self._refresh_thread.start()
+
+    def ensure_fresh(self):
+        """Return the client, refreshing its token first only when it is about to expire."""
+        left = self.seconds_left()
+        if left > SESSION_REFRESH_MARGIN:
+            return self.client
+
+        if left > SESSION_EXPIRY_MARGIN:
+            self._refresh_in_background()
+            return self.client
+
+        self.refresh()
+        if self.seconds_left() <= SESSION_EXPIRY_MARGIN:
+            raise RuntimeError(f"Supabase session could not be refreshed: {self.last_error}")
+        return self.client
+
+
 def get_authenticated_supabase():
     token = st.session_state.get("token")
 
@@ -130,18 +405,18 @@ def get_authenticated_supabase():
         st.error("Authentication expired — log in again.")
         st.stop()
 
-    client = get_supabase()
+    # Reuse this session's client (it already carries the auth headers and
+    # sits on the shared connection pool from db.get_http_pool)
+    auth_session = st.session_state.get(SUPABASE_AUTH_KEY)
+    if auth_session is not None:
+        try:
+            return auth_session.ensure_fresh()
+        except Exception:
+            # Refresh token is no longer valid - sign in again below
+            st.session_state.pop(SUPABASE_AUTH_KEY, None)
 
-    cached_session = st.session_state.get("supabase_session")
-    if isinstance(cached_session, dict):
-        access_token = cached_session.get("access_token")
-        refresh_token = cached_session.get("refresh_token")
-        if access_token and refresh_token:
-            try:
-                client.auth.set_session(access_token, refresh_token)
-                return client
-            except Exception:
-                st.session_state.pop("supabase_session", None)
+    # SupabaseSession owns token refresh, so the client's own timer is off
+    client = get_supabase(auto_refresh_token=False)
 
     try:
         auth_res = client.auth.sign_in_with_id_token({
@@ -149,13 +424,6 @@ def get_authenticated_supabase():
             "id_token": token["id_token"],
             "token": token["access_token"]
         })
-
-        session = getattr(auth_res, "session", None)
-        if session is not None:
-            st.session_state["supabase_session"] = {
-                "access_token": getattr(session, "access_token", None),
-                "refresh_token": getattr(session, "refresh_token", None),
-            }
     except Exception as e:
         msg = str(e)
         if "rate limit" in msg.lower():
@@ -165,16 +433,64 @@ def get_authenticated_supabase():
             st.exception(e)
         st.stop()
 
+    session = getattr(auth_res, "session", None)
+    if session is not None:
+        st.session_state[SUPABASE_AUTH_KEY] = SupabaseSession(client, session)
     return client
 
 
 # -------------------------------------------------------------------
 # Microsoft ID Token Verification (JWKS)
 # -------------------------------------------------------------------
+JWKS_MIN_REFRESH_SECONDS = 60      # never refetch keys more often than this
+VERIFIED_TOKEN_CACHE_SIZE = 1024
+
+
+class MicrosoftJwks:
+    """
+    Microsoft signing keys by kid. The key set is refetched only when a token
+    names a kid we have not seen (key rotation), at most every JWKS_MIN_REFRESH_SECONDS.
+    """
+
+    def __init__(self, jwks_url: str):
+        self._fetcher = PyJWKClient(jwks_url, cache_jwk_set=False, cache_keys=False)
+        self._keys = {}
+        self._fetched_at = None     # monotonic time of the last fetch; None = never fetched
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        jwk_set = self._fetcher.get_jwk_set()
+        self._keys = {k.key_id: k for k in jwk_set.keys if k.key_id}
+        self._fetched_at = time.monotonic()
+
+    def get_signing_key(self, kid: str):
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+
+        with self._lock:
+            key = self._keys.get(kid)
+            if key is None and (
+                self._fetched_at is None
+                or time.monotonic() - self._fetched_at >= JWKS_MIN_REFRESH_SECONDS
+            ):
+                self.refresh()
+                key = self._keys.get(kid)
+
+        if key is None:
+            raise jwt.InvalidTokenError(f"Unknown signing key id: {kid}")
+        return key
+
+
+@st.cache_resource(show_spinner=False)
+def _get_ms_jwks(tenant_id: str) -> MicrosoftJwks:
+    return MicrosoftJwks(f"https://login.microsoftonline.com/{tenant_id}/discovery/v2.0/keys")
+
+
 @st.cache_resource(show_spinner=False)
-def _get_ms_jwk_client(tenant_id: str) -> PyJWKClient:
-    jwks_url = f"https://login.microsoftonline.com/{tenant_id}/discovery/v2.0/keys"
-    return PyJWKClient(jwks_url)
+def _verified_token_cache() -> tuple:
+    """Process-wide {sha256(token): claims} LRU plus its lock."""
+    return OrderedDict(), threading.Lock()
 
 
 def verify_microsoft_id_token(id_token: str) -> dict:
@@ -185,6 +501,8 @@ def verify_microsoft_id_token(id_token: str) -> dict:
     - exp/nbf
     - aud matches configured Azure client_id
     - iss is a Microsoft issuer (and matches tenant when tenant_id is not 'common')
+
+    Verified claims are memoized per token until `exp`, so reruns skip the RS256 check.
     """
     azure = st.secrets.get("azure", {})
     client_id = azure.get("client_id")
@@ -193,8 +511,33 @@ def verify_microsoft_id_token(id_token: str) -> dict:
     if not client_id:
         raise RuntimeError("Azure client_id is not configured.")
 
-    jwk_client = _get_ms_jwk_client(tenant_id)
-    signing_key = jwk_client.get_signing_key_from_jwt(id_token).key
+    cache, lock = _verified_token_cache()
+    cache_key = hashlib.sha256(f"{tenant_id}|{client_id}|{id_token}".encode("utf-8")).hexdigest()
+
+    with lock:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            if cached.get("exp", 0) > time.time():
+                cache.move_to_end(cache_key)
+                return dict(cached)
+            del cache[cache_key]
+
+    claims = _verify_microsoft_id_token_uncached(id_token, client_id, tenant_id)
+
+    if claims.get("exp"):
+        with lock:
+            cache[cache_key] = dict(claims)
+            while len(cache) > VERIFIED_TOKEN_CACHE_SIZE:
+                cache.popitem(last=False)
+
+    return claims
+
+
+def _verify_microsoft_id_token_uncached(id_token: str, client_id: str, tenant_id: str) -> dict:
+    kid = jwt.get_unverified_header(id_token).get("kid")
+    if not kid:
+        raise jwt.InvalidTokenError("Token header has no kid.")
+    signing_key = _get_ms_jwks(tenant_id).get_signing_key(kid).key
 
     claims = jwt.decode(
         id_token,
@@ -233,6 +576,111 @@ def verify_microsoft_id_token(id_token: str) -> dict:
 
     return claims
 
+
+# -------------------------------------------------------------------
+# Auth Context (resolved once per session)
+# -------------------------------------------------------------------
+AUTH_CONTEXT_KEY = "auth_context"
+
+
+@dataclass(frozen=True)
+class AuthContext:
+    """The signed-in user, resolved once per login and kept in session state."""
+    id_token: str
+    user_email: str
+    user_name: str
+    is_authorised: bool
+    is_admin: bool
+    claims: dict = field(default_factory=dict, repr=False)
+
+    @property
+    def email_key(self) -> str:
+        """Lower-cased email, as stored in members.employee_email."""
+        return self.user_email.lower()
+
+
+def format_display_name(raw_name: str) -> str:
+    """Convert Microsoft's "Last, First" display names to "First Last"."""
+    raw_name = raw_name or ""
+    if "," in raw_name:
+        last, first = [x.strip() for x in raw_name.split(",", 1)]
+        return f"{first} {last}"
+    return raw_name.strip()
+
+
+def resolve_auth_context():
+    """
+    Return the session's AuthContext, or None when nobody is logged in.
+
+    The ID token is verified and the identity/access flags computed only when
+    the token changes (or expires); every other rerun is a session-state lookup.
+    Raises the verification error when the token is invalid.
+    """
+    token = st.session_state.get("token")
+    if not token or "id_token" not in token:
+        return None
+
+    id_token = token["id_token"]
+    auth = st.session_state.get(AUTH_CONTEXT_KEY)
+    if (
+        auth is not None
+        and auth.id_token == id_token
+        and auth.claims.get("exp", 0) > time.time()
+    ):
+        return auth
+
+    claims = verify_microsoft_id_token(id_token)
+
+    user_email = (
+        claims.get("preferred_username")
+        or claims.get("email")
+        or claims.get("upn")
+        or claims.get("unique_name")
+        or ""
+    )
+    user_name = format_display_name(claims.get("name", "Unknown User"))
+    is_authorised, is_admin = _access_flags(user_email)
+
+    # A different login must not inherit the previous user's Supabase session
+    if auth is not None:
+        st.session_state.pop(SUPABASE_AUTH_KEY, None)
+
+    auth = AuthContext(
+        id_token=id_token,
+        user_email=user_email,
+        user_name=user_name,
+        is_authorised=is_authorised,
+        is_admin=is_admin,
+        claims=claims,
+    )
+    st.session_state[AUTH_CONTEXT_KEY] = auth
+    st.session_state["user_name"] = user_name
+    st.session_state["user_email"] = user_email
+    return auth
+
+
+def require_auth_context(login_message="✖ You must be logged in to access this page."):
+    """resolve_auth_context() for protected pages; stops the page when not logged in."""
+    if not st.session_state.get("token"):
+        st.error(login_message)
+        back_button("Home.py")
+        st.write("---")
+        st.stop()
+
+    try:
+        auth = resolve_auth_context()
+    except Exception:
+        auth = None
+
+    if auth is None:
+        st.session_state.pop(AUTH_CONTEXT_KEY, None)
+        st.error("✖ Invalid login session. Please sign in again.")
+        back_button("Home.py")
+        st.write("---")
+        st.stop()
+
+    return auth
+
 # -------------------------------------------------------------------
 # Convert Member Rows → DataFrame for Data Editor
 # -------------------------------------------------------------------
@@ -268,57 +716,199 @@ def members_to_dataframe(members, team_lookup=None):
     return df
 
 
+# -------------------------------------------------------------------
+# Member Index: Admin panel buckets built in one pass
+# -------------------------------------------------------------------
+@dataclass(frozen=True)
+class MemberIndex:
+    """Member rows bucketed by team, status and volunteering area."""
+    by_team: dict = field(default_factory=dict)         # str(team_id) -> members on that team
+    active_counts: dict = field(default_factory=dict)   # team_id -> members not on the waiting list
+    waiting: tuple = ()
+    unassigned: tuple = ()                              # active, no valid team, not volunteering
+    volunteers: tuple = ()                              # active with a volunteering area
+    by_volunteer_area: dict = field(default_factory=dict)
+
+    def team_members(self, team_id) -> tuple:
+        return self.by_team.get(str(team_id), ())
+
+    def active_count(self, team_id) -> int:
+        return self.active_counts.get(team_id, 0)
+
+    @property
+    def confirmed_member_count(self) -> int:
+        return sum(self.active_counts.values())
+
+
+def build_member_index(members, team_ids=()) -> MemberIndex:
+    """
+    Bucket member rows in a single pass. `team_ids` are the confirmed (non-waiting)
+    teams. Rebuilt on every run: one pass is cheaper than any key that would
+    notice writes made outside this process.
+    """
+    valid = {str(t): t for t in team_ids}
+    by_team, active_counts, by_area = {}, {}, {}
+    waiting, unassigned, volunteers = [], [], []
+
+    for m in members:
+        tid = m.get("team_id")
+        if tid is not None:
+            by_team.setdefault(str(tid), []).append(m)
+
+        if bool(m.get("on_waiting_list")):
+            waiting.append(m)
+            continue
+
+        on_team = tid is not None and str(tid) in valid
+        if on_team:
+            key = valid[str(tid)]
+            active_counts[key] = active_counts.get(key, 0) + 1
+
+        areas_text = (m.get("volunteering_area") or "").strip()
+        if areas_text:
+            volunteers.append(m)
+            for area in {a.strip() for a in areas_text.split(",") if a.strip()}:
+                by_area.setdefault(area, []).append(m)
+        elif not on_team:
+            unassigned.append(m)
+
+    return MemberIndex(
+        by_team={k: tuple(v) for k, v in by_team.items()},
+        active_counts=active_counts,
+        waiting=tuple(waiting),
+        unassigned=tuple(unassigned),
+        volunteers=tuple(volunteers),
+        by_volunteer_area={k: tuple(v) for k, v in by_area.items()},
+    )
+
+
+# -------------------------------------------------------------------
+# Lazy Sections: only build an expander's body while it is open
+# -------------------------------------------------------------------
+OPEN_SECTIONS_KEY = "open_sections"
+
+
+def lazy_expander(label: str, section: str, **kwargs):
+    """
+    st.expander that reruns when toggled, so callers can build the body only
+    when `.open` is True. The open state is remembered per `section`: labels
+    carrying counts would otherwise make Streamlit treat it as a new expander
+    and collapse it after every edit.
+    """
+    opened = st.session_state.setdefault(OPEN_SECTIONS_KEY, set())
+    exp = st.expander(
+        label,
+        expanded=section in opened,
+        key=f"section_{section}",
+        on_change="rerun",
+        **kwargs,
+    )
+    if exp.open:
+        opened.add(section)
+    else:
+        opened.discard(section)
+    return exp
+
+
+def section_is_open(section: str) -> bool:
+    """Whether a lazy_expander section is open, readable before it is drawn this run."""
+    key = f"section_{section}"
+    if key in st.session_state:
+        return bool(st.session_state[key])
+    return section in st.session_state.get(OPEN_SECTIONS_KEY, ())
+
+
 # -------------------------------------------------------------------
 # Excel Export Helpers (styling + formatting)
 # -------------------------------------------------------------------
+# Exports stream through write-only worksheets: rows are written once and never
+# revisited, so memory and time stay linear in the number of members.
 HEADER_FONT = Font(bold=True, color="FFFFFF")
 HEADER_FILL = PatternFill("solid", fgColor="4F81BD")
 THIN_BORDER = Border(
     left=Side(style="thin"), right=Side(style="thin"),
     top=Side(style="thin"), bottom=Side(style="thin")
 )
+EXPORT_HEADER_STYLE = "export_header"
+EXPORT_CELL_STYLE = "export_cell"
+EXPORT_MIN_COLUMN_WIDTH = 15
+
+
+def _new_export_workbook() -> Workbook:
+    """Write-only workbook with the header/cell named styles registered once."""
+    wb = Workbook(write_only=True)
+    # NamedStyles bind to their workbook, so each export gets fresh instances
+    wb.add_named_style(NamedStyle(
+        name=EXPORT_HEADER_STYLE,
+        font=HEADER_FONT,
+        fill=HEADER_FILL,
+        alignment=Alignment(horizontal="center"),
+        border=THIN_BORDER,
+    ))
+    wb.add_named_style(NamedStyle(name=EXPORT_CELL_STYLE, border=THIN_BORDER))
+    return wb
+
 
+def _styled_cell(ws, value, style: str) -> WriteOnlyCell:
+    cell = WriteOnlyCell(ws, value=value)
+    cell.style = style
+    return cell
 
-def _style_worksheet(ws):
-    """Apply header styling, borders, and column sizing to worksheet."""
-    # Style header row
-    for cell in ws[1]:
-        cell.font = HEADER_FONT
-        cell.fill = HEADER_FILL
-        cell.alignment = Alignment(horizontal="center")
-        cell.border = THIN_BORDER
-    # Apply borders to all cells
-    for row in ws.iter_rows():
-        for cell in row:
-            cell.border = THIN_BORDER
-    # Auto-size columns
-    for col in ws.columns:
-        max_len = max(len(str(cell.value or "")) for cell in col)
-        ws.column_dimensions[col[0].column_letter].width = max(15, max_len + 2)
+
+def _write_sheet(wb, title: str, headers, rows):
+    """
+    Append a styled sheet to a write-only workbook. Column widths are measured
+    while the rows are collected (write-only sheets need them before the first
+    row), then every row is written with its named style in a single pass.
+    """
+    ws = wb.create_sheet(title=title[:31])  # Excel limit = 31 chars
+
+    widths = [len(str(h)) for h in headers]
+    values = []
+    for row in rows:
+        for i, value in enumerate(row):
+            widths[i] = max(widths[i], len(str(value or "")))
+        values.append(row)
+
+    for i, width in enumerate(widths, start=1):
+        ws.column_dimensions[get_column_letter(i)].width = max(EXPORT_MIN_COLUMN_WIDTH, width + 2)
+    ws.freeze_panes = "A2"
+
+    ws.append([_styled_cell(ws, h, EXPORT_HEADER_STYLE) for h in headers])
+
+    # Appended rows are serialised immediately, so one styled cell per column
+    # can be refilled for every row: styles resolve once per sheet, not per cell
+    cells = [_styled_cell(ws, None, EXPORT_CELL_STYLE) for _ in headers]
+    for row in values:
+        for cell, value in zip(cells, row):
+            cell.value = value
+        ws.append(cells)
+    return ws
+
+
+def _save_workbook(wb) -> BytesIO:
+    buffer = BytesIO()
+    wb.save(buffer)
+    buffer.seek(0)
+    return buffer
 
 
 # -------------------------------------------------------------------
 # Excel Export
 # -------------------------------------------------------------------
+EXPORT_HEADERS = [
+    "Team Name", "On Waiting List", "Name", "Email", "Employee ID", "Mobile Number", "Preferred Route", "Organisation",
+    "Role", "Shirt Size", "Forces Veteran", "Camping Friday",
+    "Camping Saturday", "Taking Car", "Hiking Experience",
+    "Travelling From", "Notes", "Volunteering Area"
+]
+
+
 def export_excel(client):
     teams = client.table("teams").select("id, team_name, route").execute().data or []
     members = client.table("members").select("*").execute().data or []
     team_lookup = {t["id"]: t["team_name"] for t in teams}
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "All Members"
-
-    HEADERS = [
-        "Team Name", "On Waiting List", "Name", "Email", "Employee ID", "Mobile Number", "Preferred Route", "Organisation",
-        "Role", "Shirt Size", "Forces Veteran", "Camping Friday",
-        "Camping Saturday", "Taking Car", "Hiking Experience",
-        "Travelling From", "Notes", "Volunteering Area"
-    ]
-
-    ws.append(HEADERS)
-    _style_worksheet(ws)
-
     # Sort members: by team name (Unassigned last), then by on_waiting_list (False first)
     sorted_members = sorted(
         members,
@@ -329,8 +919,8 @@ def export_excel(client):
         )
     )
 
-    for m in sorted_members:
-        ws.append([
+    rows = (
+        (
             team_lookup.get(m.get("team_id"), "Unassigned"),
             "Yes" if m.get("on_waiting_list") else "No",
             m.get("full_name", ""),
@@ -347,19 +937,43 @@ def export_excel(client):
             m.get("taking_car", False),
             m.get("hiking_experience", ""),
             m.get("travelling_from", ""),
-            m.get("notes", ""), 
+            m.get("notes", ""),
             m.get("volunteering_area", ""),
-        ])
+        )
+        for m in sorted_members
+    )
 
-    _style_worksheet(ws)
-    ws.freeze_panes = "A2"
+    wb = _new_export_workbook()
+    _write_sheet(wb, "All Members", EXPORT_HEADERS, rows)
+    return _save_workbook(wb)
 
-    buffer = BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
-    return buffer
+
+EXPORT_CACHE_TTL = 600  # seconds; bounds staleness from writes made outside this process
+
+
+@st.cache_data(ttl=EXPORT_CACHE_TTL, max_entries=4, show_spinner=False)
+def _export_excel_cached(_client, data_version: int) -> bytes:
+    return export_excel(_client).getvalue()
+
+
+def get_excel_export(client) -> bytes:
+    """
+    Teams workbook as bytes, built at most once per data version (any write
+    through db.py bumps it). Pass it to st.download_button via a callable so
+    it is only generated when someone downloads it.
+    """
+    return _export_excel_cached(client, get_data_version())
 
 
+# Full list of areas from volunteer form (same as 9_Volunteers.py)
+VOLUNTEER_EXPORT_AREAS = [
+    "Communications and Marketing (including Getting our Walkers Challenge Ready!)",
+    "Pre-Event Organisation",
+    "Merchandise Support (Source, Design, and Order)",
+    "Setting up the DXC tent and Merch distrubition",
+    "Participant support on the day",
+]
+
 
 def export_volunteers_excel(client):
     members = (
@@ -370,58 +984,24 @@ def export_volunteers_excel(client):
         or []
     )
 
-    # Full list of areas from volunteer form (same as 9_Volunteers.py)
-    AREA_OPTIONS = [
-        "Communications and Marketing (including Getting our Walkers Challenge Ready!)",
-        "Pre-Event Organisation",
-        "Merchandise Support (Source, Design, and Order)",
-        "Setting up the DXC tent and Merch distrubition",
-        "Participant support on the day",
-    ]
-
-    wb = Workbook()
+    # One pass: bucket each member under every area they selected
+    rows_by_area = {area: [] for area in VOLUNTEER_EXPORT_AREAS}
+    for m in members:
+        areas = {a.strip() for a in (m.get("volunteering_area") or "").split(",") if a.strip()}
+        for area in areas & rows_by_area.keys():
+            rows_by_area[area].append((
+                m.get("full_name", ""),
+                m.get("employee_email", ""),
+                m.get("employee_id", ""),
+                m.get("mobile_number", ""),
+            ))
 
     # --- Build one worksheet per area -------------------------------------
-    for area in AREA_OPTIONS:
-        ws = wb.create_sheet(title=area[:31])  # Excel limit = 31 chars
-
-        HEADERS = [
-            "Full Name",
-            "Email",
-            "Employee ID",
-            "Mobile Number",
-        ]
-        ws.append(HEADERS)
-        _style_worksheet(ws)
-
-        # Filter members who selected this area
-        for m in members:
-            area_list = [
-                a.strip()
-                for a in (m.get("volunteering_area") or "").split(",")
-                if a.strip()
-            ]
-
-            if area in area_list:
-                ws.append([
-                    m.get("full_name", ""),
-                    m.get("employee_email", ""),
-                    m.get("employee_id", ""),
-                    m.get("mobile_number", ""),
-                ])
-
-        _style_worksheet(ws)
-        ws.freeze_panes = "A2"
-
-    # Remove the default first empty sheet openpyxl creates
-    if "Sheet" in wb.sheetnames:
-        std = wb["Sheet"]
-        wb.remove(std)
+    wb = _new_export_workbook()
+    for area in VOLUNTEER_EXPORT_AREAS:
+        _write_sheet(wb, area, ["Full Name", "Email", "Employee ID", "Mobile Number"], rows_by_area[area])
 
-    buffer = BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
-    return buffer
+    return _save_workbook(wb)
 
 
 
@@ -449,179 +1029,575 @@ COLUMN_MAP = {
 }
 
 
-def apply_member_updates(edited_df, original_df, team_name_to_id, client):
-    if edited_df is None or edited_df.empty:
-        return 0
+def _is_nan(value) -> bool:
+    return value is pd.NA or (isinstance(value, float) and math.isnan(value))
 
-    updates = 0
 
-    # Convert IDs to strings once
-    original_df["id"] = original_df["id"].astype(str)
-    edited_df["id"] = edited_df["id"].astype(str)
+def get_editor_edited_rows(key: str):
+    """Return the st.data_editor edited-rows delta for `key` (None if unavailable)."""
+    state = st.session_state.get(key)
+    if isinstance(state, dict):
+        return state.get("edited_rows")
+    return None
 
-    for _, row in edited_df.iterrows():
-        member_id = row["id"]
-        orig = original_df[original_df["id"] == member_id].iloc[0]
 
+def diff_frames(edited_df, original_df, columns, edited_rows=None) -> dict:
+    """
+    Compare edited rows against the originals (aligned on "id") and return
+    {id: {column: new_value}} for the cells that changed.
+
+    - Missing on both sides counts as unchanged; NaN new values are skipped (not JSON compliant)
+    - edited_rows: optional st.data_editor delta ({row_position: {column: value}});
+      when given, only those rows are compared
+    """
+    if edited_df is None or edited_df.empty or original_df is None or original_df.empty:
+        return {}
+
+    if edited_rows is not None:
+        if not edited_rows:
+            return {}
+        positions = sorted({int(p) for p in edited_rows if 0 <= int(p) < len(edited_df)})
+        edited_df = edited_df.iloc[positions]
+
+    cols = [c for c in columns if c in edited_df.columns and c in original_df.columns]
+    if not cols:
+        return {}
+
+    new = edited_df[cols].set_axis(edited_df["id"].astype(str), axis=0)
+    old = original_df[cols].set_axis(original_df["id"].astype(str), axis=0)
+    old = old[~old.index.duplicated()]
+    new = new[new.index.isin(old.index)]
+    old = old.reindex(new.index)
+
+    changed = (new.ne(old) & ~(new.isna() & old.isna())).to_numpy(dtype=bool)
+    row_idx, col_idx = np.nonzero(changed)
+
+    change_set = {}
+    for r, c in zip(row_idx, col_idx):
+        new_val = new.iat[r, c]
+        if _is_nan(new_val):
+            continue
+        if isinstance(new_val, np.generic):
+            new_val = new_val.item()
+        change_set.setdefault(new.index[r], {})[cols[c]] = new_val
+
+    return change_set
+
+
+def diff_member_updates(edited_df, original_df, team_name_to_id, edited_rows=None) -> dict:
+    """Return {member_id: {db_column: value}} for edited member rows."""
+    cell_changes = diff_frames(edited_df, original_df, ["Team Name", *COLUMN_MAP], edited_rows)
+
+    change_set = {}
+    for member_id, cells in cell_changes.items():
         changes = {}
+        for col, new_val in cells.items():
+            # TEAM NAME special case
+            if col == "Team Name":
+                changes["team_id"] = None if new_val == "Unassigned" else team_name_to_id.get(new_val)
+            else:
+                changes[COLUMN_MAP[col]] = new_val
+        change_set[member_id] = changes
 
-        for col, new_val in row.items():
-            if col == "id":
-                continue
+    return change_set
 
-            old_val = orig[col]
 
-            # TEAM NAME special case
-            if col == "Team Name":
-                mapped = None if new_val == "Unassigned" else team_name_to_id.get(new_val)
-                if new_val != old_val:
-                    changes["team_id"] = mapped
-                continue
+# -------------------------------------------------------------------
+# Batched Writes (admin + self-service editors)
+# -------------------------------------------------------------------
+BULK_UPDATE_RPC = {
+    "members": "bulk_update_members",
+    "teams": "bulk_update_teams",
+}
 
-            # Regular field update
-            db_col = COLUMN_MAP.get(col)
-            if db_col and new_val != old_val:
-                # Skip NaN values as they're not JSON compliant
-                if isinstance(new_val, float) and math.isnan(new_val):
-                    continue
-                changes[db_col] = new_val
 
-        if changes:
-            try:
-                client.table("members").update(changes).eq("id", member_id).execute()
-                updates += 1
-            except Exception as e:
-                st.error(f"Failed to update {member_id}: {e}")
+@dataclass
+class BulkWriteResult:
+    updated: list = field(default_factory=list)
+    errors: dict = field(default_factory=dict)  # row id -> error message
+    round_trips: int = 0
+
+
+def _update_rows(client, table, changes, ids, result):
+    """One update for every row sharing the same change dict; pinpoints failing rows on error."""
+    try:
+        client.table(table).update(changes).in_("id", ids).execute()
+        result.round_trips += 1
+        result.updated.extend(ids)
+        return
+    except Exception as e:
+        result.round_trips += 1
+        if len(ids) == 1:
+            result.errors[ids[0]] = str(e)
+            return
+
+    for row_id in ids:
+        try:
+            client.table(table).update(changes).eq("id", row_id).execute()
+            result.updated.append(row_id)
+        except Exception as e:
+            result.errors[row_id] = str(e)
+        result.round_trips += 1
+
+
+def bulk_update(client, table: str, change_set: dict, atomic: bool = False) -> BulkWriteResult:
+    """
+    Apply {row_id: {column: value}} with as few round trips as possible.
+
+    - Rows with identical changes (e.g. the same team or waiting-list flag) share one update
+    - Mixed changes go through the table's bulk RPC in a single call, falling back to
+      grouped updates if the RPC fails
+    - atomic=True: one RPC call, all rows applied or none (every row reported on failure)
+    """
+    result = BulkWriteResult()
+    if not change_set:
+        return result
+
+    groups = {}
+    for row_id, changes in change_set.items():
+        key = tuple(sorted(changes.items(), key=lambda kv: kv[0]))
+        groups.setdefault(key, (changes, []))[1].append(row_id)
+
+    rpc_name = BULK_UPDATE_RPC.get(table)
+    if atomic and not rpc_name:
+        raise ValueError(f"No bulk update RPC configured for table '{table}'.")
+
+    if atomic or (len(groups) > 1 and rpc_name):
+        payload = [{"id": row_id, "changes": changes} for row_id, changes in change_set.items()]
+        try:
+            client.rpc(rpc_name, {"p_changes": payload}).execute()
+            result.round_trips += 1
+            result.updated.extend(change_set)
+            return result
+        except Exception as e:
+            result.round_trips += 1
+            if atomic:
+                result.errors = {row_id: str(e) for row_id in change_set}
+                return result
+
+    for changes, ids in groups.values():
+        _update_rows(client, table, changes, ids, result)
+
+    return result
+
+
+def apply_member_updates(edited_df, original_df, team_name_to_id, client, edited_rows=None, atomic=False):
+    change_set = diff_member_updates(edited_df, original_df, team_name_to_id, edited_rows)
+    if not change_set:
+        return 0
+
+    result = bulk_update(client, "members", change_set, atomic=atomic)
+    for member_id, err in result.errors.items():
+        st.error(f"Failed to update {member_id}: {err}")
+
+    if result.updated:
+        invalidate_capacity_snapshot()
+    return len(result.updated)
+
+
+# -------------------------------------------------------------------
+# Atomic Team Writes (limits enforced in the same database call)
+# -------------------------------------------------------------------
+# The RPCs come from supabase/migrations/20261017000100_atomic_team_writes.sql.
+# Until that migration has run, both helpers fall back to the previous
+# check-then-write table queries (correct, but not race-free).
+MAX_TEAM_MEMBERS = 5
+MAX_TEAMS = 34
+
 
-    return updates
+def _is_missing_rpc(e: Exception) -> bool:
+    """True when PostgREST reports that the called database function does not exist."""
+    code = str(getattr(e, "code", "") or "")
+    return code in ("PGRST202", "42883") or "Could not find the function" in str(e)
 
 
-def delete_member(member_id: int, client):
+def _create_team_tables(client, team_name: str, route: str, max_teams: int):
+    dup = client.table("teams").select("id").eq("team_name", team_name).limit(1).execute()
+    if dup.data:
+        return {"status": "duplicate", "team": None}
+
+    team_count_res = client.table("teams").select("id", count="exact").limit(1).execute()
+    insert_res = client.table("teams").insert({
+        "team_name": team_name,
+        "route": route,
+        "on_waiting_list": (team_count_res.count or 0) >= max_teams,
+    }).execute()
+    return {"status": "created", "team": insert_res.data[0] if insert_res.data else None}
+
+
+def create_team(client, team_name: str, route: str, max_teams: int = MAX_TEAMS):
+    """
+    Create a team in one call (create_team RPC). Teams past `max_teams` are
+    created on the waiting list.
+
+    Returns (status, team) where status is "created" or "duplicate".
+    """
+    try:
+        res = client.rpc("create_team", {
+            "p_team_name": team_name,
+            "p_route": route,
+            "p_max_teams": max_teams,
+        }).execute()
+        result = res.data or {}
+    except Exception as e:
+        if not _is_missing_rpc(e):
+            raise
+        result = _create_team_tables(client, team_name, route, max_teams)
+
+    if result.get("status") == "created":
+        invalidate_capacity_snapshot()
+    return result.get("status"), result.get("team")
+
+
+def save_member(client, record: dict, member_id=None, max_team_members: int = MAX_TEAM_MEMBERS,
+                allow_waiting_team: bool = True):
+    """
+    Insert (member_id=None) or update a member in one call (save_member RPC).
+    If the record sets team_id, the team's size is checked under a row lock in
+    the same transaction, so concurrent joins cannot overfill it.
+
+    Returns (status, member) where status is "saved", "team_full",
+    "team_unavailable" or "not_found".
+    """
+    try:
+        res = client.rpc("save_member", {
+            "p_member_id": None if member_id is None else str(member_id),
+            "p_record": record,
+            "p_max_team_members": max_team_members,
+            "p_allow_waiting_team": allow_waiting_team,
+        }).execute()
+        result = res.data or {}
+    except Exception as e:
+        if not _is_missing_rpc(e):
+            raise
+        result = _save_member_tables(client, record, member_id, max_team_members, allow_waiting_team)
+
+    if result.get("status") == "saved":
+        invalidate_capacity_snapshot()
+    return result.get("status"), result.get("member")
+
+
+def _save_member_tables(client, record: dict, member_id, max_team_members: int, allow_waiting_team: bool):
+    team_id = record.get("team_id")
+    if team_id is not None:
+        team_res = client.table("teams").select("id, on_waiting_list").eq("id", team_id).limit(1).execute()
+        team = team_res.data[0] if team_res.data else None
+        if team is None or (team.get("on_waiting_list") and not allow_waiting_team):
+            return {"status": "team_unavailable", "member": None}
+
+        size_query = client.table("members").select("id", count="exact").eq("team_id", team_id)
+        if member_id is not None:
+            size_query = size_query.neq("id", member_id)
+        if (size_query.execute().count or 0) >= max_team_members:
+            return {"status": "team_full", "member": None}
+
+    if member_id is None:
+        res = client.table("members").insert(record).execute()
+    else:
+        res = client.table("members").update(record).eq("id", member_id).execute()
+        if not res.data:
+            return {"status": "not_found", "member": None}
+    return {"status": "saved", "member": res.data[0] if res.data else None}
+
+
+def discard_new_team(client, team_id):
+    """
+    Delete a team created earlier in a submit whose member save then failed,
+    so no empty team is left behind. Teams that already have members are kept.
+    """
+    try:
+        members = client.table("members").select("id").eq("team_id", team_id).limit(1).execute()
+        if not members.data:
+            client.table("teams").delete().eq("id", team_id).execute()
+            invalidate_capacity_snapshot()
+    except Exception:
+        pass
+
+
+def delete_member(member_id: int, client, rerun: bool = True) -> bool:
+    """Delete a member. With rerun=False the caller decides how to rerun; returns True on success."""
     try:
         client.table("members").delete().eq("id", member_id).execute()
-        st.success("Member deleted.")
-        st.rerun()
+        invalidate_capacity_snapshot()
     except Exception as e:
         st.error(f"Failed to delete member: {e}")
+        return False
+
+    st.success("Member deleted.")
+    if rerun:
+        st.rerun()
+    return True
 
 
-def delete_team(team_id: int, client):
+def delete_team(team_id: int, client, rerun: bool = True) -> bool:
+    """Delete a team and unassign its members. rerun works as in delete_member."""
     try:
         # Unassign members instead of deleting them
         client.table("members").update({"team_id": None}).eq("team_id", team_id).execute()
 
         # Delete the actual team
         client.table("teams").delete().eq("id", team_id).execute()
-
-        st.success("Team deleted.")
-        st.rerun()
+        invalidate_capacity_snapshot()
     except Exception as e:
         st.error(f"Failed to delete team: {e}")
+        return False
+
+    st.success("Team deleted.")
+    if rerun:
+        st.rerun()
+    return True
 
 
 # -------------------------------------------------------------------
-# Helpers: prepare/sanitize member records for DB and counts
+# Capacity Snapshot: walker / volunteer / team counts in one pass
 # -------------------------------------------------------------------
-def get_active_member_count(client) -> int:
-    """Return the count of members not on the waiting list."""
+CAPACITY_SNAPSHOT_TTL = 15  # seconds
+
+ON_DAY_VOLUNTEER_AREAS = (
+    "Setting up the DXC tent and Merch distrubition",
+    "Participant support on the day",
+)
+
+_CAPACITY_MEMBER_COLS = (
+    "id, team_id, preferred_route, shirt_size, camping_fri, camping_sat, taking_car, "
+    "travelling_from, notes, hiking_experience, volunteering_area"
+)
+
+
+def _is_walker(m: dict) -> bool:
+    """A member is walking if any walking field is filled in (volunteer-only records have none)."""
+    if m.get("team_id") is not None:
+        return True
+    if (m.get("preferred_route") or "").strip():
+        return True
+    if (m.get("shirt_size") or "").strip():
+        return True
+    if bool(m.get("camping_fri")) or bool(m.get("camping_sat")):
+        return True
+    if bool(m.get("taking_car")):
+        return True
+    if (m.get("travelling_from") or "").strip():
+        return True
+    if (m.get("notes") or "").strip():
+        return True
+    if (m.get("hiking_experience") or "").strip():
+        return True
+    return False
+
+
+@dataclass(frozen=True)
+class CapacitySnapshot:
+    """Active (not waiting list) registration counts used for capacity checks."""
+    members: int = 0
+    walkers: int = 0
+    volunteers: int = 0
+    on_day_volunteers: int = 0
+    teams: int = 0
+    on_day_volunteer_ids: frozenset = frozenset()
+
+    def on_day_volunteer_count(self, exclude_member_id: str | None = None) -> int:
+        if exclude_member_id is not None and str(exclude_member_id) in self.on_day_volunteer_ids:
+            return self.on_day_volunteers - 1
+        return self.on_day_volunteers
+
+
+def build_capacity_snapshot(member_rows, team_count: int = 0) -> CapacitySnapshot:
+    """Classify active member rows in a single pass."""
+    members = walkers = volunteers = 0
+    on_day_ids = set()
+
+    for m in member_rows:
+        members += 1
+        if _is_walker(m):
+            walkers += 1
+        areas_text = (m.get("volunteering_area") or "").strip()
+        if areas_text:
+            volunteers += 1
+            if any(t in areas_text for t in ON_DAY_VOLUNTEER_AREAS):
+                on_day_ids.add(str(m.get("id")))
+
+    return CapacitySnapshot(
+        members=members,
+        walkers=walkers,
+        volunteers=volunteers,
+        on_day_volunteers=len(on_day_ids),
+        teams=team_count,
+        on_day_volunteer_ids=frozenset(on_day_ids),
+    )
+
+
+@st.cache_data(ttl=CAPACITY_SNAPSHOT_TTL, show_spinner=False)
+def _load_capacity_snapshot(_client) -> CapacitySnapshot:
+    rows = (
+        _client.table("members")
+        .select(_CAPACITY_MEMBER_COLS)
+        .eq("on_waiting_list", False)
+        .execute()
+        .data
+        or []
+    )
+    team_res = _client.table("teams").select("id", count="exact").limit(1).execute()
+    return build_capacity_snapshot(rows, team_res.count or 0)
+
+
+def get_capacity_snapshot(client, refresh: bool = False) -> CapacitySnapshot:
+    """
+    Return the shared capacity snapshot (cached for CAPACITY_SNAPSHOT_TTL seconds).
+    Use refresh=True on submit paths that must see the latest counts.
+    """
+    if refresh:
+        invalidate_capacity_snapshot()
     try:
-        res = client.table("members").select("id", count="exact").eq("on_waiting_list", False).execute()
-        return res.count or 0
+        return _load_capacity_snapshot(client)
     except Exception:
-        return 0
+        return CapacitySnapshot()
 
 
-def get_active_walker_count(client) -> int:
-    """Return the count of active members who are walking (excludes volunteer-only records)."""
-    try:
-        rows = (
-            client.table("members")
-            .select(
-                "id, on_waiting_list, team_id, preferred_route, shirt_size, camping_fri, camping_sat, taking_car, travelling_from, notes, hiking_experience"
-            )
-            .eq("on_waiting_list", False)
-            .execute()
-            .data
-            or []
-        )
+def invalidate_capacity_snapshot():
+    """Drop the cached snapshot - call after any write that changes member/team counts."""
+    _load_capacity_snapshot.clear()
 
-        def _is_walker(m: dict) -> bool:
-            if m.get("team_id") is not None:
-                return True
-            if (m.get("preferred_route") or "").strip():
-                return True
-            if (m.get("shirt_size") or "").strip():
-                return True
-            if bool(m.get("camping_fri")) or bool(m.get("camping_sat")):
-                return True
-            if bool(m.get("taking_car")):
-                return True
-            if (m.get("travelling_from") or "").strip():
-                return True
-            if (m.get("notes") or "").strip():
-                return True
-            if (m.get("hiking_experience") or "").strip():
-                return True
-            return False
-
-        return sum(1 for m in rows if _is_walker(m))
-    except Exception:
-        return 0
 
+# -------------------------------------------------------------------
+# Admission Control: cap concurrent submit pipelines, queue the rest
+# -------------------------------------------------------------------
+ADMISSION_LIMITS = {"submit": 8}   # pipelines allowed to hit Supabase at once
+ADMISSION_MAX_WAIT = 120           # seconds a session may queue before giving up
+ADMISSION_POLL = 0.5               # seconds between queue position updates
+ADMISSION_MAX_QUERIES = 12         # most sequential Supabase calls one submit makes
 
-def get_active_volunteer_count(client) -> int:
-    """Return the count of active members who are volunteering (excludes waiting list)."""
-    try:
-        rows = (
-            client.table("members")
-            .select("id, on_waiting_list, volunteering_area")
-            .eq("on_waiting_list", False)
-            .execute()
-            .data
-            or []
-        )
+# Slots are released when the block exits, however it exits, so only a hung
+# holder needs reclaiming. Every call is bounded by the client timeouts, so a
+# holder past this has hung rather than just being slow.
+ADMISSION_MAX_HOLD = ADMISSION_MAX_QUERIES * (POOL_TIMEOUT.connect + POOL_TIMEOUT.read)
 
-        count = 0
-        for r in rows:
-            areas_text = (r.get("volunteering_area") or "").strip()
-            if areas_text:
-                count += 1
-        return count
-    except Exception:
-        return 0
 
+class AdmissionTimeout(Exception):
+    pass
 
-def get_active_on_day_volunteer_count(client, exclude_member_id: str | None = None) -> int:
-    try:
-        rows = (
-            client.table("members")
-            .select("id, on_waiting_list, volunteering_area")
-            .eq("on_waiting_list", False)
-            .execute()
-            .data
-            or []
-        )
 
-        on_day_tokens = {
-            "Setting up the DXC tent and Merch distrubition",
-            "Participant support on the day",
-        }
+class AdmissionTicket:
+    """One session's place in the waiting room; `admitted` is set when it gets a slot."""
 
-        count = 0
-        for r in rows:
-            rid = str(r.get("id"))
-            if exclude_member_id is not None and rid == str(exclude_member_id):
-                continue
-            areas_text = (r.get("volunteering_area") or "").strip()
-            if not areas_text:
-                continue
-            if any(t in areas_text for t in on_day_tokens):
-                count += 1
-        return count
-    except Exception:
-        return 0
+    def __init__(self):
+        self.admitted = threading.Event()
+
+
+class AdmissionController:
+    """
+    Process-wide FIFO waiting room. At most `limit` tickets are admitted at a
+    time; everyone else waits in arrival order and can ask for their position.
+    Waiters sleep on their own ticket's event, so only the tickets that
+    actually get a freed slot wake up.
+    """
+
+    def __init__(self, limit: int, max_hold: float = ADMISSION_MAX_HOLD):
+        self.limit = limit
+        self.max_hold = max_hold
+        self._lock = threading.Lock()
+        self._active = {}       # ticket -> admitted at (monotonic)
+        self._queue = deque()
+
+    def _reclaim_stale(self):
+        cutoff = time.monotonic() - self.max_hold
+        for ticket in [t for t, since in self._active.items() if since < cutoff]:
+            del self._active[ticket]
+
+    def _admit_waiting(self):
+        self._reclaim_stale()
+        while self._queue and len(self._active) < self.limit:
+            ticket = self._queue.popleft()
+            self._active[ticket] = time.monotonic()
+            ticket.admitted.set()
+
+    def join(self) -> AdmissionTicket:
+        ticket = AdmissionTicket()
+        with self._lock:
+            self._queue.append(ticket)
+            self._admit_waiting()
+        return ticket
+
+    def wait(self, ticket: AdmissionTicket, timeout: float) -> bool:
+        """Block up to `timeout` seconds; True once `ticket` is admitted."""
+        if ticket.admitted.wait(timeout):
+            return True
+        # Nobody released in time: a slot may be held by a session that died
+        with self._lock:
+            self._admit_waiting()
+        return ticket.admitted.is_set()
+
+    def position(self, ticket: AdmissionTicket) -> int:
+        """1-based place in the queue (0 when admitted or unknown)."""
+        with self._lock:
+            try:
+                return self._queue.index(ticket) + 1
+            except ValueError:
+                return 0
+
+    def release(self, ticket: AdmissionTicket):
+        with self._lock:
+            self._active.pop(ticket, None)
+            try:
+                self._queue.remove(ticket)
+            except ValueError:
+                pass
+            self._admit_waiting()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"active": len(self._active), "queued": len(self._queue), "limit": self.limit}
+
+
+@st.cache_resource(show_spinner=False)
+def get_admission_controller(pipeline: str = "submit") -> AdmissionController:
+    return AdmissionController(ADMISSION_LIMITS.get(pipeline, 8))
+
+
+def _stop_requested() -> bool:
+    """True once Streamlit has asked this script run to stop or rerun."""
+    ctx = get_script_run_ctx(suppress_warning=True)
+    requests = getattr(ctx, "script_requests", None)
+    return getattr(requests, "_state", ScriptRequestType.CONTINUE) != ScriptRequestType.CONTINUE
+
+
+@contextmanager
+def admission(pipeline: str = "submit", max_wait: float = ADMISSION_MAX_WAIT):
+    """
+    Run the block once this session is admitted to `pipeline`, showing the
+    queue position meanwhile, so a burst of submits cannot swamp Supabase.
+    Stops the page if the wait exceeds `max_wait`.
+    """
+    controller = get_admission_controller(pipeline)
+    ticket = controller.join()
+    try:
+        if not controller.wait(ticket, 0):
+            placeholder = st.empty()
+            deadline = time.monotonic() + max_wait
+            shown_position = None
+            while not controller.wait(ticket, ADMISSION_POLL):
+                # A stopped or rerun session leaves the queue too: its next st call raises
+                if _stop_requested() or time.monotonic() > deadline:
+                    placeholder.empty()
+                    raise AdmissionTimeout(pipeline)
+                position = controller.position(ticket)
+                if position != shown_position:
+                    placeholder.info(
+                        f"Lots of people are registering right now — you are number "
+                        f"{position} in the queue. Please keep this page open."
+                    )
+                    shown_position = position
+            placeholder.empty()
+        yield
+    except AdmissionTimeout:
+        st.error("Registration is very busy at the moment. Please try again in a minute.")
+        st.stop()
+    finally:
+        controller.release(ticket)
 
 
+# -------------------------------------------------------------------
+# Helpers: prepare/sanitize member records for DB
+# -------------------------------------------------------------------
 def prepare_member_record(draft: dict, on_waiting_list: bool | None = None, client=None) -> dict:
     """
     Creates a sanitized DB-ready member record from the session draft.
@@ -695,6 +1671,56 @@ def prepare_member_record(draft: dict, on_waiting_list: bool | None = None, clie
 # -------------------------------------------------------------------
 # GPX Utilities: Parsing & Distance/Elevation Calculations
 # -------------------------------------------------------------------
+_GPX_POINT_TAGS = {"trkpt", "rtept", "wpt"}
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _iter_gpx_tag(path, tag):
+    """
+    Stream (lat, lon, ele) for every <tag> point using iterparse.
+    Finished elements are detached from their parent so memory stays flat.
+    """
+    with open(path, "rb") as f:
+        stack = []
+        open_points = 0
+        for event, elem in ET.iterparse(f, events=("start", "end")):
+            name = _local_name(elem.tag)
+            if event == "start":
+                stack.append(elem)
+                if name in _GPX_POINT_TAGS:
+                    open_points += 1
+                continue
+
+            stack.pop()
+            if name in _GPX_POINT_TAGS:
+                open_points -= 1
+                if name == tag:
+                    ele_el = elem.find(".//{*}ele")
+                    ele = float(ele_el.text) if ele_el is not None else None
+                    yield (float(elem.get("lat")), float(elem.get("lon")), ele)
+
+            # Keep children of an open point until the point itself is read
+            if open_points == 0 and stack:
+                stack[-1].remove(elem)
+
+
+def iter_gpx_points(path):
+    """
+    Incrementally yield (lat, lon, ele) from a GPX file.
+    Track points are preferred; route points are read only if there are none.
+    """
+    found = False
+    for pt in _iter_gpx_tag(path, "trkpt"):
+        found = True
+        yield pt
+
+    if not found:
+        yield from _iter_gpx_tag(path, "rtept")
+
+
 def load_gpx_points(path):
     """
     Load GPX points from a file path.
@@ -703,52 +1729,75 @@ def load_gpx_points(path):
     try:
         if not os.path.exists(path):
             return None
-        with open(path, "rb") as f:
-            root = ET.parse(f).getroot()
-
-        points = []
-
-        # Track points (preferred)
-        for trk in root.findall(".//{*}trk"):
-            for seg in trk.findall(".//{*}trkseg"):
-                for pt in seg.findall(".//{*}trkpt"):
-                    lat = float(pt.get("lat"))
-                    lon = float(pt.get("lon"))
-                    ele_el = pt.find(".//{*}ele")
-                    ele = float(ele_el.text) if ele_el is not None else None
-                    points.append((lat, lon, ele))
+        points = list(iter_gpx_points(path))
+        return points if points else None
+    except Exception:
+        return None
 
-        # Route points (fallback)
-        if not points:
-            for pt in root.findall(".//{*}rtept"):
-                lat = float(pt.get("lat"))
-                lon = float(pt.get("lon"))
-                ele_el = pt.find(".//{*}ele")
-                ele = float(ele_el.text) if ele_el is not None else None
-                points.append((lat, lon, ele))
 
-        return points if points else None
+def load_gpx_track(path):
+    """Like load_gpx_points, but streams straight into a TrackArrays (None if empty/unreadable)."""
+    try:
+        if not os.path.exists(path):
+            return None
+        track = TrackArrays.from_points(iter_gpx_points(path))
+        return track if len(track) else None
     except Exception:
         return None
 
 
+EARTH_RADIUS_M = 6371000.0
+
+
+@dataclass(frozen=True)
+class TrackArrays:
+    """Contiguous float64 lat/lon/ele arrays for a track (ele is NaN where missing)."""
+    lat: np.ndarray
+    lon: np.ndarray
+    ele: np.ndarray
+
+    @classmethod
+    def from_points(cls, points):
+        """Build from any iterable of (lat, lon, ele) - generators are consumed without a list copy."""
+        data = np.fromiter(
+            ((lat, lon, np.nan if ele is None else ele) for lat, lon, ele in points),
+            dtype=np.dtype((np.float64, 3)),
+        ).reshape(-1, 3)
+        return cls(
+            lat=np.ascontiguousarray(data[:, 0]),
+            lon=np.ascontiguousarray(data[:, 1]),
+            ele=np.ascontiguousarray(data[:, 2]),
+        )
+
+    def __len__(self):
+        return len(self.lat)
+
+    def to_points(self):
+        ele = self.ele.astype(object)
+        ele[np.isnan(self.ele)] = None
+        return list(zip(self.lat.tolist(), self.lon.tolist(), ele.tolist()))
+
+
+def as_track_arrays(points) -> TrackArrays:
+    return points if isinstance(points, TrackArrays) else TrackArrays.from_points(points)
+
+
 def haversine_m(lat1, lon1, lat2, lon2):
-    """Great-circle distance between two lat/lon points in meters."""
-    R = 6371000.0
-    phi1, phi2 = math.radians(lat1), math.radians(lat2)
-    dphi = math.radians(lat2 - lat1)
-    dlmb = math.radians(lon2 - lon1)
-    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return R * c
+    """Great-circle distance in meters; accepts scalars or NumPy arrays (element-wise)."""
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = np.radians(np.subtract(lon2, lon1))
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlmb / 2) ** 2
+    d = 2 * EARTH_RADIUS_M * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return float(d) if np.ndim(d) == 0 else d
 
 
 def compute_track_stats(points):
     """
     Compute distance (km), ascent/descent (m), and cumulative arrays for plotting.
-    points: [(lat, lon, ele), ...]
+    points: [(lat, lon, ele), ...] or TrackArrays
     """
-    if not points or len(points) < 2:
+    if points is None or len(points) < 2:
         return {
             "distance_km": 0.0,
             "ascent_m": 0.0,
@@ -757,40 +1806,90 @@ def compute_track_stats(points):
             "elev": [],
         }
 
-    distance_m = 0.0
-    ascent_m = 0.0
-    descent_m = 0.0
-
-    cum_dist_km = [0.0]
-    elev = [points[0][2] if points[0][2] is not None else None]
+    track = as_track_arrays(points)
 
-    for i in range(1, len(points)):
-        lat1, lon1, ele1 = points[i - 1]
-        lat2, lon2, ele2 = points[i]
+    seg_m = haversine_m(track.lat[:-1], track.lon[:-1], track.lat[1:], track.lon[1:])
+    cum_dist_km = np.empty(len(track), dtype=np.float64)
+    cum_dist_km[0] = 0.0
+    np.cumsum(seg_m, out=cum_dist_km[1:])
+    cum_dist_km /= 1000.0
 
-        d = haversine_m(lat1, lon1, lat2, lon2)
-        distance_m += d
-        cum_dist_km.append(distance_m / 1000.0)
+    # Deltas are NaN wherever either end is missing an elevation
+    delta = np.diff(track.ele)
+    has_delta = ~np.isnan(delta)
+    ascent_m = float(delta[has_delta & (delta > 0)].sum())
+    descent_m = float(abs(delta[has_delta & (delta < 0)].sum()))
 
-        if ele1 is not None and ele2 is not None:
-            delta = ele2 - ele1
-            if delta > 0:
-                ascent_m += delta
-            elif delta < 0:
-                descent_m += -delta
-            elev.append(ele2)
-        else:
-            elev.append(None)
+    elev = np.empty(len(track), dtype=object)
+    elev[0] = None if np.isnan(track.ele[0]) else float(track.ele[0])
+    elev[1:] = np.where(has_delta, track.ele[1:], None)
 
     return {
-        "distance_km": distance_m / 1000.0,
+        "distance_km": float(cum_dist_km[-1]),
         "ascent_m": ascent_m,
         "descent_m": descent_m,
-        "cum_dist_km": cum_dist_km,
-        "elev": elev,
+        "cum_dist_km": cum_dist_km.tolist(),
+        "elev": elev.tolist(),
     }
 
 
+def _douglas_peucker_mask(xy: np.ndarray, tolerance: float) -> np.ndarray:
+    """Boolean keep-mask for Douglas-Peucker on projected (x, y) metres."""
+    n = len(xy)
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end <= start + 1:
+            continue
+
+        a = xy[start]
+        ab = xy[end] - a
+        rel = xy[start + 1:end] - a
+        seg_len = math.hypot(ab[0], ab[1])
+        if seg_len == 0:
+            dist = np.hypot(rel[:, 0], rel[:, 1])
+        else:
+            dist = np.abs(ab[0] * rel[:, 1] - ab[1] * rel[:, 0]) / seg_len
+
+        i = int(np.argmax(dist))
+        if dist[i] > tolerance:
+            split = start + 1 + i
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+
+    return keep
+
+
+def simplify_polyline(points, tolerance_m: float = 5.0, max_points: int | None = 1000):
+    """
+    Douglas-Peucker simplification of a track for display.
+    Returns [(lat, lon), ...] keeping both ends; tolerance_m is doubled until the
+    result fits in max_points (None = no cap).
+    """
+    track = as_track_arrays(points)
+    if len(track) <= 2:
+        return list(zip(track.lat.tolist(), track.lon.tolist()))
+
+    # Local equirectangular projection - accurate enough at route scale
+    lat0 = math.radians(float(np.mean(track.lat)))
+    xy = np.column_stack((
+        np.radians(track.lon) * math.cos(lat0) * EARTH_RADIUS_M,
+        np.radians(track.lat) * EARTH_RADIUS_M,
+    ))
+
+    tolerance = max(float(tolerance_m), 0.0)
+    keep = _douglas_peucker_mask(xy, tolerance)
+    while max_points and keep.sum() > max(max_points, 2):
+        tolerance = tolerance * 2 if tolerance > 0 else 1.0
+        keep = _douglas_peucker_mask(xy, tolerance)
+
+    return list(zip(track.lat[keep].tolist(), track.lon[keep].tolist()))
+
+
 def trim_outliers(points, q=0.01):
     """
     Trim GPS outliers by removing points outside the [q, 1-q] quantile range
@@ -845,13 +1944,127 @@ def mid_route_center(points, cum_dist_km):
     if not points or not cum_dist_km:
         return points[0][:2] if points else (54.46, -3.02)
 
-    total = cum_dist_km[-1]
-    target = total / 2.0
-    idx = min(range(len(cum_dist_km)), key=lambda i: abs(cum_dist_km[i] - target))
+    cum = np.asarray(cum_dist_km, dtype=np.float64)
+    idx = int(np.argmin(np.abs(cum - cum[-1] / 2.0)))
     lat, lon, _ = points[idx]
     return (lat, lon)
 
 
+# -------------------------------------------------------------------
+# Route Cache: parsed GPX + stats shared across all sessions
+# -------------------------------------------------------------------
+@dataclass(frozen=True)
+class RouteData:
+    points: list
+    points_trim: list
+    stats_raw: dict
+    stats_trim: dict
+    bounds: tuple
+    centre: tuple
+    gpx_bytes: bytes
+    display_coords: list  # simplified [(lat, lon)] for the map; full track stays in points
+    gpx_sha256: str
+
+
+def _resolve_asset_path(path) -> Path:
+    path = Path(path)
+    return path if path.is_absolute() else BASE_DIR / path
+
+
+ROUTE_SIMPLIFY_TOLERANCE_M = 5.0
+ROUTE_MAX_DISPLAY_POINTS = 1000
+
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def _load_route_cached(path: str, mtime: float, tolerance_m: float, max_points: int) -> RouteData | None:
+    track = load_gpx_track(path)
+    if track is None:
+        return None
+
+    gpx_bytes = Path(path).read_bytes()
+    points = track.to_points()
+    points_trim = trim_outliers(points, q=0.01)
+    stats_trim = compute_track_stats(points_trim)
+
+    return RouteData(
+        points=points,
+        points_trim=points_trim,
+        stats_raw=compute_track_stats(track),
+        stats_trim=stats_trim,
+        bounds=expanded_bounds(points, margin_frac=0.08),
+        centre=mid_route_center(points_trim, stats_trim["cum_dist_km"]),
+        gpx_bytes=gpx_bytes,
+        display_coords=simplify_polyline(track, tolerance_m, max_points),
+        gpx_sha256=hashlib.sha256(gpx_bytes).hexdigest(),
+    )
+
+
+def load_route(
+    path,
+    tolerance_m: float = ROUTE_SIMPLIFY_TOLERANCE_M,
+    max_points: int = ROUTE_MAX_DISPLAY_POINTS,
+) -> RouteData | None:
+    """
+    Return the cached RouteData for a GPX file (None if missing/unreadable).
+    Keyed by path + mtime, so an updated file is re-parsed on the next request.
+    tolerance_m / max_points control the simplified map polyline.
+    """
+    resolved = _resolve_asset_path(path)
+    try:
+        mtime = resolved.stat().st_mtime
+    except OSError:
+        return None
+    return _load_route_cached(str(resolved), mtime, tolerance_m, max_points)
+
+
+# -------------------------------------------------------------------
+# Route Map: pre-rendered Folium HTML per route
+# -------------------------------------------------------------------
+ROUTE_MAP_DEFAULTS = {
+    "tiles": "OpenTopoMap",
+    "zoom_start": 13,
+    "line_color": "#6A307D",
+    "line_weight": 9,
+    "line_opacity": 0.95,
+}
+
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def _render_route_map_html(gpx_sha256: str, _route: RouteData, tiles: str, zoom_start: int,
+                           line_color: str, line_weight: int, line_opacity: float) -> str:
+    coords = _route.display_coords
+    min_lat, min_lon, max_lat, max_lon = _route.bounds
+
+    m = folium.Map(location=_route.centre, zoom_start=zoom_start, tiles=tiles)
+
+    folium.PolyLine(
+        coords,
+        color=line_color,
+        weight=line_weight,
+        opacity=line_opacity
+    ).add_to(m)
+
+    folium.Marker(coords[0], popup="Start", icon=folium.Icon(color="green")).add_to(m)
+    folium.Marker(coords[-1], popup="End", icon=folium.Icon(color="red")).add_to(m)
+
+    m.fit_bounds([[min_lat, min_lon], [max_lat, max_lon]])
+
+    return m._repr_html_()
+
+
+def get_route_map_html(path, **map_params) -> str | None:
+    """
+    Return the ready-made map HTML for a GPX route (None if the GPX is missing).
+    Cached by GPX content hash + map parameters, so it is built once per process.
+    """
+    route = load_route(path)
+    if route is None:
+        return None
+
+    params = {**ROUTE_MAP_DEFAULTS, **map_params}
+    return _render_route_map_html(route.gpx_sha256, route, **params)
+
+
 # -------------------------------------------------------------------
 # SIMPLE BACK BUTTON HELPER
 # -------------------------------------------------------------------
@@ -884,3 +2097,65 @@ def remove_st_branding():
         """,
         height=0,
     )
+
+
+# -------------------------------------------------------------------
+# Warm-up: prime the shared caches before the first real user arrives
+# -------------------------------------------------------------------
+def _warm_jwks():
+    tenant_id = st.secrets.get("azure", {}).get("tenant_id", "common")
+    _get_ms_jwks(tenant_id).refresh()
+
+
+def warm_up() -> dict:
+    """
+    Load route data + map HTML, the header font, images and the Microsoft JWKS into the
+    process-wide caches. Returns {step: seconds taken | "error: ..."}.
+    """
+    report = {}
+
+    def _step(name, fn):
+        start = time.perf_counter()
+        try:
+            fn()
+            report[name] = round(time.perf_counter() - start, 3)
+        except Exception as e:
+            report[name] = f"error: {e}"
+
+    for gpx_path in sorted(ASSETS_DIR.glob("*.gpx")):
+        _step(f"route:{gpx_path.name}", lambda p=gpx_path: get_route_map_html(p))
+    _step("header_font", lambda: _header_font_css(static_serving_enabled()))
+    _step("images", lambda: (get_page_icon(), get_logo_url(), get_background_image_url()))
+    _step("jwks", _warm_jwks)
+
+    return report
+
+
+WARM_UP_TIMEOUT = 120  # seconds wait_for_warm_up() waits before giving up
+
+
+def _run_warm_up(result: Future):
+    try:
+        result.set_result(warm_up())
+    except Exception as e:
+        result.set_exception(e)
+
+
+@st.cache_resource(show_spinner=False)
+def start_warm_up() -> Future:
+    """
+    Run warm_up() once per server process in a background thread. Called from
+    init_page and Home, so the first script run of any page starts it; later
+    calls return the same Future, which resolves to the warm_up() report.
+    """
+    result = Future()
+    threading.Thread(target=_run_warm_up, args=(result,), name="cache-warm-up", daemon=True).start()
+    return result
+
+
+def wait_for_warm_up(timeout: float = WARM_UP_TIMEOUT):
+    """Start warm-up if needed and block until it finishes. Returns its report, or None on timeout."""
+    try:
+        return start_warm_up().result(timeout=timeout)
+    except FutureTimeoutError:
+        return None
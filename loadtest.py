@@ -0,0 +1,334 @@
+# Registration-day load test: drives simulated sessions through
+# Personal -> Team -> Review against the in-memory backend (local_db.py).
+#
+#   python loadtest.py --sessions 300 --concurrency 50 --latency-ms 40
+#
+# AppTest is not thread-safe, so "concurrent" sessions are interleaved one page
+# step at a time in random order: with --concurrency 50, fifty colleagues can all
+# have loaded the team list before any of them clicks "Select". That reproduces
+# the check-then-act races deterministically (--seed) while each step's latency
+# is measured on its own.
+#
+# Reports p50/p95/p99 latency and queries per page step, and whether the team
+# (5 members), team count (34), walker (170) and volunteer (20) limits held, and
+# that the admission waiting room's waiters sleep instead of spinning.
+import os
+
+# Must be set before db/helpers are imported anywhere
+os.environ["SUPABASE_BACKEND"] = "local"
+
+import argparse
+import json
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+import local_db
+
+APP_DIR = Path(__file__).resolve().parent
+MAIN_SCRIPT = str(APP_DIR / "Home.py")
+PAGE_TIMEOUT = 60  # seconds per script run
+
+# Limits enforced by the pages (see 3_Personal.py, 4_Team.py, 7_Review.py)
+MAX_TEAM_MEMBERS = 5
+MAX_TEAMS = 34
+MAX_WALKERS = 170
+MAX_VOLUNTEERS = 20
+MAX_ON_DAY_VOLUNTEERS = 20
+
+VOLUNTEER_AREAS = [
+    "Setting up the DXC tent and Merch distrubition",
+    "Participant support on the day",
+    "Fundraising support",
+]
+ROUTES = ["Peak", "Tough", "Tougher"]
+
+
+class StepRecorder:
+    """Times each AppTest run and counts the local_db queries it made."""
+
+    def __init__(self, db):
+        self.db = db
+        self.timings = defaultdict(list)
+        self.queries = defaultdict(list)
+
+    def run(self, at, step):
+        before = sum(self.db.query_counts.values())
+        start = time.perf_counter()
+        at.run(timeout=PAGE_TIMEOUT)
+        self.timings[step].append(time.perf_counter() - start)
+        self.queries[step].append(sum(self.db.query_counts.values()) - before)
+        if at.exception:
+            raise RuntimeError(f"{step}: {at.exception[0].message}")
+
+
+def _click(at, label):
+    for button in at.button:
+        if button.label == label:
+            button.click()
+            return True
+    return False
+
+
+# -------------------------------------------------------------------
+# One simulated registration (a generator: yields between page steps)
+# -------------------------------------------------------------------
+def registration_session(i, rng, recorder, join_ratio):
+    participation = rng.choices(["Walking", "Both", "Volunteering"], weights=[7, 2, 1])[0]
+    draft = {"participation_type": participation}
+    if participation != "Walking":
+        areas = [rng.choice(VOLUNTEER_AREAS)]
+        draft["volunteering_area_selection"] = areas
+        draft["volunteering_area"] = ", ".join(areas)
+
+    at = AppTest.from_file(MAIN_SCRIPT, default_timeout=PAGE_TIMEOUT)
+    at.session_state["token"] = {"id_token": f"loadtest-{i}", "access_token": f"loadtest-{i}"}
+    at.session_state["agreement_confirmed"] = True
+    at.session_state["user_email"] = f"loadtest.user{i}@dxc.com"
+    at.session_state["user_name"] = f"User{i}, Load"
+    at.session_state["draft"] = draft
+
+    # Step 3: Personal details
+    at.switch_page("pages/3_Personal.py")
+    recorder.run(at, "3_Personal render")
+    yield
+    at.text_input[2].input(f"LT{i:05d}")
+    at.button[0].click()
+    recorder.run(at, "3_Personal submit")
+    yield
+
+    # Step 4: Team (the submit above already rendered it via st.switch_page)
+    if participation != "Volunteering":
+        at.switch_page("pages/4_Team.py")
+        joined = False
+        if rng.random() < join_ratio:
+            at.selectbox[0].select("Join a Team")
+            recorder.run(at, "4_Team join list")
+            yield
+            team_buttons = [b.label for b in at.button if b.label.startswith("Select ")]
+            if team_buttons:
+                _click(at, rng.choice(team_buttons))
+                joined = True
+            else:
+                at.selectbox[0].select("Continue Independently")
+                recorder.run(at, "4_Team render")
+        if not joined:
+            _click(at, "Confirm Independent Participation")
+        recorder.run(at, "4_Team submit")
+        yield
+
+        # Route + logistics pages only fill in the draft; do that directly
+        draft = at.session_state["draft"]
+        draft.update({
+            "preferred_route": draft.get("team_route") or rng.choice(ROUTES),
+            "shirt_size": rng.choice(["S", "M", "L", "XL"]),
+            "camping_fri": False,
+            "camping_sat": False,
+            "taking_car": False,
+            "travelling_from": None,
+            "notes": None,
+            "hiking_experience": None,
+        })
+        at.session_state["draft"] = draft
+
+    # Step 7: Review & submit
+    at.switch_page("pages/7_Review.py")
+    recorder.run(at, "7_Review render")
+    yield
+    _click(at, "✔ Confirm & Submit")
+    recorder.run(at, "7_Review submit")
+
+
+def run_sessions(count, concurrency, rng, recorder, join_ratio, first_id=0):
+    """Interleave `count` sessions, keeping up to `concurrency` in flight."""
+    pending = list(range(first_id, first_id + count))
+    active = {}
+    failures = []
+
+    while pending or active:
+        while pending and len(active) < concurrency:
+            i = pending.pop(0)
+            active[i] = registration_session(i, random.Random(rng.random()), recorder, join_ratio)
+
+        i = rng.choice(list(active))
+        try:
+            next(active[i])
+        except StopIteration:
+            del active[i]
+        except Exception as e:
+            failures.append((i, str(e)))
+            del active[i]
+
+    return failures
+
+
+# -------------------------------------------------------------------
+# Seeding + checks
+# -------------------------------------------------------------------
+def seed_database(db, teams, rng):
+    """`teams` teams, each with a leader and 0-3 members, so joins contend for spots."""
+    db.reset()
+    db.seed({"teams": [
+        {"team_name": f"DXC Load Team {n:02d}", "route": rng.choice(ROUTES)}
+        for n in range(teams)
+    ]})
+
+    members = []
+    for team in db.tables["teams"].values():
+        for k in range(1 + rng.randint(0, 3)):
+            members.append({
+                "team_id": team["id"],
+                "role": "Leader" if k == 0 else "Member",
+                "full_name": f"Seed {team['id']}-{k}",
+                "employee_email": f"seed.{team['id']}.{k}@dxc.com",
+                "preferred_route": team["route"],
+            })
+    db.seed({"members": members})
+    db.query_counts.clear()
+
+
+def check_capacity(db):
+    from helpers import _is_walker, build_capacity_snapshot
+
+    members = list(db.tables["members"].values())
+    active = [m for m in members if not m.get("on_waiting_list")]
+    teams = list(db.tables["teams"].values())
+    snapshot = build_capacity_snapshot(
+        active, sum(1 for t in teams if not t.get("on_waiting_list"))
+    )
+
+    team_sizes = Counter(m["team_id"] for m in active if m.get("team_id") is not None)
+    emails = Counter((m.get("employee_email") or "").lower() for m in members)
+    # The volunteer cap only turns away volunteer-only registrations
+    volunteer_only = sum(
+        1 for m in active
+        if (m.get("volunteering_area") or "").strip() and not _is_walker(m)
+    )
+
+    violations = {
+        "overfilled_teams": {tid: n for tid, n in team_sizes.items() if n > MAX_TEAM_MEMBERS},
+        "active_teams_over_limit": max(0, snapshot.teams - MAX_TEAMS),
+        "walkers_over_limit": max(0, snapshot.walkers - MAX_WALKERS),
+        "volunteer_only_over_limit": max(0, volunteer_only - MAX_VOLUNTEERS),
+        "on_day_volunteers_over_limit": max(0, snapshot.on_day_volunteers - MAX_ON_DAY_VOLUNTEERS),
+        "duplicate_emails": {e: n for e, n in emails.items() if e and n > 1},
+    }
+    return snapshot, violations
+
+
+def check_admission_waiting_room(limit=2, waiters=12, hold_s=0.3, poll_s=0.1):
+    """
+    Queue `waiters` threads behind `limit` held slots, looping on wait() the way
+    helpers.admission() does. Each waiter should loop about once per poll while
+    queued; many more means waiters are waking each other (busy-spinning).
+    Returns the waiters whose loop count exceeded waited/poll + 2.
+    """
+    from helpers import AdmissionController
+
+    controller = AdmissionController(limit)
+    held = [controller.join() for _ in range(limit)]
+    loops = {}
+    waited = {}
+
+    def waiter(n):
+        ticket = controller.join()
+        start = time.monotonic()
+        count = 0
+        while not controller.wait(ticket, poll_s):
+            count += 1
+        waited[n] = time.monotonic() - start
+        loops[n] = count
+        time.sleep(hold_s)
+        controller.release(ticket)
+
+    threads = [threading.Thread(target=waiter, args=(n,)) for n in range(waiters)]
+    for t in threads:
+        t.start()
+    time.sleep(hold_s)
+    for ticket in held:
+        controller.release(ticket)
+    for t in threads:
+        t.join()
+
+    return {n: count for n, count in loops.items() if count > waited[n] / poll_s + 2}
+
+
+def percentiles(samples):
+    p50, p95, p99 = np.percentile(np.asarray(samples) * 1000.0, [50, 95, 99])
+    return {"n": len(samples), "p50_ms": p50, "p95_ms": p95, "p99_ms": p99}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Registration-day load test against the local backend.")
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50, help="sessions in flight at once")
+    parser.add_argument("--teams", type=int, default=30, help="teams seeded before the run")
+    parser.add_argument("--join-ratio", type=float, default=0.7, help="share of walkers who join a team")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated database round trip")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    os.chdir(APP_DIR)
+    rng = random.Random(args.seed)
+    db = local_db.get_local_database()
+    db.latency_s = args.latency_ms / 1000.0
+
+    # Warm imports and caches outside the measured window
+    seed_database(db, args.teams, rng)
+    run_sessions(1, 1, rng, StepRecorder(db), args.join_ratio, first_id=-1)
+
+    seed_database(db, args.teams, rng)
+    recorder = StepRecorder(db)
+    start = time.perf_counter()
+    failures = run_sessions(args.sessions, args.concurrency, rng, recorder, args.join_ratio)
+    elapsed = time.perf_counter() - start
+
+    snapshot, violations = check_capacity(db)
+    violations["busy_admission_waiters"] = check_admission_waiting_room()
+    report = {
+        "sessions": args.sessions,
+        "concurrency": args.concurrency,
+        "elapsed_s": elapsed,
+        "failures": len(failures),
+        "pages": {
+            step: {**percentiles(samples), "queries_mean": float(np.mean(recorder.queries[step]))}
+            for step, samples in recorder.timings.items()
+        },
+        "total_queries": sum(db.query_counts.values()),
+        "queries_by_table": {f"{t}.{a}": n for (t, a), n in sorted(db.query_counts.items())},
+        "capacity": {
+            "walkers": snapshot.walkers,
+            "volunteers": snapshot.volunteers,
+            "on_day_volunteers": snapshot.on_day_volunteers,
+            "teams": snapshot.teams,
+        },
+        "violations": violations,
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2, default=str))
+    else:
+        print(f"{args.sessions} sessions, {args.concurrency} in flight: "
+              f"{elapsed:.1f}s, {len(failures)} failed")
+        print(f"{'step':<20}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}")
+        for step, row in report["pages"].items():
+            print(f"{step:<20}{row['n']:>6}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}"
+                  f"{row['p99_ms']:>10.1f}{row['queries_mean']:>9.1f}")
+        print(f"total queries: {report['total_queries']}")
+        print(f"capacity: {report['capacity']}")
+        broken = {k: v for k, v in violations.items() if v}
+        print("capacity checks: " + ("OK" if not broken else f"VIOLATED {broken}"))
+        for i, err in failures[:10]:
+            print(f"  session {i} failed: {err}")
+
+    raise SystemExit(1 if failures or any(violations.values()) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+# local_db.py
+"""
+In-memory stand-in for the Supabase project, for offline runs, profiling and
+load tests.
+
+It implements the slice of the supabase-py API the app uses:
+
+    client.table("members").select("id, team_id", count="exact").eq(...).in_(...)
+          .order("team_name").limit(1).execute()
+    client.table("teams").insert({...}).execute()
+    client.table("members").update({...}).eq("id", 1).execute()
+    client.table("members").delete().eq("id", 1).execute()
+    client.rpc("bulk_update_members", {"p_changes": [...]}).execute()
+    client.rpc("save_member", {"p_member_id": None, "p_record": {...}}).execute()
+    client.auth.sign_in_with_id_token(...) / refresh_session(...)
+
+Responses are postgrest APIResponse objects and errors are postgrest APIErrors,
+so calling code cannot tell the difference. Switch it on from db.py with
+SUPABASE_BACKEND=local (environment) or BACKEND = "local" under [supabase] in
+secrets.toml.
+"""
+import copy
+import json
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+
+from postgrest import APIError, APIResponse
+
+# Optional JSON file {"teams": [...], "members": [...]} loaded into a fresh database
+SEED_PATH_ENV = "LOCAL_DB_SEED"
+# Optional artificial round-trip latency (ms) added to every execute()
+LATENCY_ENV = "LOCAL_DB_LATENCY_MS"
+
+# Column -> default for each table; "id" is assigned from a per-table sequence
+SCHEMAS = {
+    "teams": {
+        "id": None,
+        "created_at": None,
+        "team_name": None,
+        "route": None,
+        "on_waiting_list": False,
+        "officially_registered": False,
+    },
+    "members": {
+        "id": None,
+        "created_at": None,
+        "team_id": None,
+        "role": None,
+        "full_name": None,
+        "organisation": None,
+        "employee_id": None,
+        "employee_email": None,
+        "mobile_number": None,
+        "volunteering_area": None,
+        "preferred_route": None,
+        "shirt_size": None,
+        "travelling_from": None,
+        "forces_vet": False,
+        "camping_fri": False,
+        "camping_sat": False,
+        "taking_car": False,
+        "hiking_experience": None,
+        "notes": None,
+        "on_waiting_list": False,
+    },
+}
+
+
+def _error(message, code="PGRST000"):
+    return APIError({"message": message, "code": code, "hint": None, "details": None})
+
+
+class LocalDatabase:
+    """Tables of row dicts behind one lock, so each statement is atomic."""
+
+    def __init__(self, schemas=SCHEMAS, latency_ms=0.0):
+        self.schemas = schemas
+        self.tables = {name: {} for name in schemas}
+        self.sequences = {name: 0 for name in schemas}
+        self.rpcs = dict(LOCAL_RPCS)
+        self.latency_s = float(latency_ms) / 1000.0
+        self.lock = threading.RLock()
+        self.query_counts = Counter()
+
+    # ---------------- helpers ----------------
+    def table_rows(self, table):
+        if table not in self.tables:
+            raise _error(f'relation "public.{table}" does not exist', "42P01")
+        return self.tables[table]
+
+    def check_columns(self, table, columns):
+        schema = self.schemas[table]
+        for col in columns:
+            if col not in schema:
+                raise _error(
+                    f"Could not find the '{col}' column of '{table}' in the schema cache",
+                    "PGRST204",
+                )
+
+    def new_row(self, table, values):
+        self.check_columns(table, values)
+        row = dict(self.schemas[table])
+        row.update(copy.deepcopy(values))
+        if row.get("id") is None:
+            self.sequences[table] += 1
+            row["id"] = self.sequences[table]
+        else:
+            self.sequences[table] = max(self.sequences[table], int(row["id"]))
+        if "created_at" in row and row["created_at"] is None:
+            row["created_at"] = datetime.now(timezone.utc).isoformat()
+        if row["id"] in self.tables[table]:
+            raise _error(f'duplicate key value violates unique constraint "{table}_pkey"', "23505")
+        return row
+
+    def seed(self, data):
+        with self.lock:
+            for table, rows in data.items():
+                self.table_rows(table)
+                for values in rows:
+                    row = self.new_row(table, values)
+                    self.tables[table][row["id"]] = row
+
+    def reset(self):
+        with self.lock:
+            for name in self.tables:
+                self.tables[name].clear()
+                self.sequences[name] = 0
+            self.query_counts.clear()
+
+    def record_query(self, table, action):
+        """Count one round trip and apply the simulated latency."""
+        with self.lock:
+            self.query_counts[(table, action)] += 1
+        if self.latency_s > 0:
+            time.sleep(self.latency_s)
+
+
+def _equal(stored, value):
+    # PostgREST sends filter values as text, so "5" matches an integer 5
+    if stored == value:
+        return True
+    return isinstance(stored, int) and not isinstance(stored, bool) and str(stored) == str(value)
+
+
+def _matches(row, filters):
+    return all(test(row.get(col)) for col, test in filters)
+
+
+def _sort_key(value):
+    # Postgres ascending order puts NULLs last
+    return (value is None, value if value is not None else 0)
+
+
+class LocalQuery:
+    """One table statement, built fluently and run by execute()."""
+
+    def __init__(self, db, table):
+        db.table_rows(table)
+        self.db = db
+        self.table = table
+        self.action = "select"
+        self.columns = None
+        self.values = None
+        self.count = None
+        self.filters = []
+        self.ordering = []
+        self.row_limit = None
+
+    # ---------------- statements ----------------
+    def select(self, columns="*", count=None):
+        self.action = "select"
+        self.columns = None if columns.strip() == "*" else [c.strip() for c in columns.split(",") if c.strip()]
+        self.count = count
+        return self
+
+    def insert(self, values, count=None, returning=None, **_):
+        self.action = "insert"
+        self.values = values if isinstance(values, list) else [values]
+        self.count = count
+        return self
+
+    def update(self, values, count=None, **_):
+        self.action = "update"
+        self.values = values
+        self.count = count
+        return self
+
+    def delete(self, count=None, **_):
+        self.action = "delete"
+        self.count = count
+        return self
+
+    # ---------------- filters ----------------
+    def _filter(self, column, test):
+        self.filters.append((column, test))
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, lambda v: v is not None and _equal(v, value))
+
+    def neq(self, column, value):
+        return self._filter(column, lambda v: v is not None and not _equal(v, value))
+
+    def gt(self, column, value):
+        return self._filter(column, lambda v: v is not None and v > value)
+
+    def gte(self, column, value):
+        return self._filter(column, lambda v: v is not None and v >= value)
+
+    def lt(self, column, value):
+        return self._filter(column, lambda v: v is not None and v < value)
+
+    def lte(self, column, value):
+        return self._filter(column, lambda v: v is not None and v <= value)
+
+    def in_(self, column, values):
+        allowed = list(values)
+        return self._filter(column, lambda v: v is not None and any(_equal(v, a) for a in allowed))
+
+    def is_(self, column, value):
+        if value in (None, "null"):
+            return self._filter(column, lambda v: v is None)
+        return self._filter(column, lambda v: v is value)
+
+    def order(self, column, desc=False, nullsfirst=None, **_):
+        self.ordering.append((column, desc))
+        return self
+
+    def limit(self, size, **_):
+        self.row_limit = size
+        return self
+
+    # ---------------- execution ----------------
+    def _project(self, row):
+        if self.columns is None:
+            return copy.deepcopy(row)
+        return {c: copy.deepcopy(row.get(c)) for c in self.columns}
+
+    def _matched(self):
+        self.db.check_columns(self.table, [col for col, _ in self.filters])
+        return [row for row in self.db.tables[self.table].values() if _matches(row, self.filters)]
+
+    def execute(self):
+        self.db.record_query(self.table, self.action)
+        with self.db.lock:
+            if self.action == "insert":
+                rows = [self.db.new_row(self.table, values) for values in self.values]
+                for row in rows:
+                    self.db.tables[self.table][row["id"]] = row
+            elif self.action == "update":
+                self.db.check_columns(self.table, self.values)
+                if "id" in self.values:
+                    raise _error("Updating the primary key is not supported locally.")
+                rows = self._matched()
+                for row in rows:
+                    row.update(copy.deepcopy(self.values))
+            elif self.action == "delete":
+                rows = self._matched()
+                for row in rows:
+                    del self.db.tables[self.table][row["id"]]
+            else:
+                if self.columns:
+                    self.db.check_columns(self.table, self.columns)
+                rows = self._matched()
+                for column, desc in reversed(self.ordering):
+                    self.db.check_columns(self.table, [column])
+                    rows.sort(key=lambda r: _sort_key(r.get(column)), reverse=desc)
+
+            total = len(rows)
+            if self.action == "select" and self.row_limit is not None:
+                rows = rows[: self.row_limit]
+            data = [self._project(row) for row in rows]
+
+        return APIResponse(data=data, count=total if self.count else None)
+
+
+# -------------------------------------------------------------------
+# RPCs (mirror supabase/migrations)
+# -------------------------------------------------------------------
+def _bulk_update(table):
+    def run(db, params):
+        changes = params.get("p_changes") or []
+        rows = db.tables[table]
+        for item in changes:
+            db.check_columns(table, item.get("changes") or {})
+        # All or nothing, like the single UPDATE statement in SQL
+        by_text_id = {str(row_id): row for row_id, row in rows.items()}
+        targets = [by_text_id.get(str(item.get("id"))) for item in changes]
+        if any(row is None for row in targets):
+            raise _error(
+                f"bulk_update_{table}: expected {len(changes)} rows, "
+                f"updated {sum(row is not None for row in targets)}",
+                "P0001",
+            )
+        for row, item in zip(targets, changes):
+            row.update(copy.deepcopy(item.get("changes") or {}))
+        return len(changes)
+    return run
+
+
+def _create_team(db, params):
+    teams = db.tables["teams"]
+    name = params.get("p_team_name")
+    if any(t.get("team_name") == name for t in teams.values()):
+        return {"status": "duplicate", "team": None}
+
+    row = db.new_row("teams", {
+        "team_name": name,
+        "route": params.get("p_route"),
+        "on_waiting_list": len(teams) >= params.get("p_max_teams", 34),
+    })
+    teams[row["id"]] = row
+    return {"status": "created", "team": row}
+
+
+def _save_member(db, params):
+    members = db.tables["members"]
+    record = params.get("p_record") or {}
+    member_id = params.get("p_member_id")
+    db.check_columns("members", record)
+
+    team_id = record.get("team_id")
+    if team_id is not None:
+        team = next((t for t in db.tables["teams"].values() if _equal(t["id"], team_id)), None)
+        if team is None or (team.get("on_waiting_list") and not params.get("p_allow_waiting_team", True)):
+            return {"status": "team_unavailable", "member": None}
+
+        team_size = sum(
+            1 for m in members.values()
+            if m.get("team_id") is not None and _equal(m["team_id"], team["id"])
+            and (member_id is None or not _equal(m["id"], member_id))
+        )
+        if team_size >= params.get("p_max_team_members", 5):
+            return {"status": "team_full", "member": None}
+
+    if member_id is None:
+        row = db.new_row("members", {k: v for k, v in record.items() if k != "id"})
+        members[row["id"]] = row
+    else:
+        row = next((m for m in members.values() if _equal(m["id"], member_id)), None)
+        if row is None:
+            return {"status": "not_found", "member": None}
+        row.update(copy.deepcopy({k: v for k, v in record.items() if k != "id"}))
+
+    return {"status": "saved", "member": row}
+
+
+LOCAL_RPCS = {
+    "bulk_update_members": _bulk_update("members"),
+    "bulk_update_teams": _bulk_update("teams"),
+    "create_team": _create_team,
+    "save_member": _save_member,
+}
+
+
+class LocalRpc:
+    def __init__(self, db, name, params):
+        self.db = db
+        self.name = name
+        self.params = params or {}
+
+    def execute(self):
+        fn = self.db.rpcs.get(self.name)
+        if fn is None:
+            raise _error(f"Could not find the function public.{self.name} in the schema cache", "PGRST202")
+        self.db.record_query(self.name, "rpc")
+        with self.db.lock:
+            # model_construct, as postgrest does: scalar function results are not lists
+            return APIResponse.model_construct(data=copy.deepcopy(fn(self.db, self.params)), count=None)
+
+
+# -------------------------------------------------------------------
+# Auth + client
+# -------------------------------------------------------------------
+LOCAL_SESSION_SECONDS = 3600
+
+
+class LocalAuth:
+    """Accepts any sign-in and hands out opaque tokens (no network, no rate limit)."""
+
+    def _session(self):
+        return SimpleNamespace(
+            access_token=f"local-{uuid4()}",
+            refresh_token=f"local-{uuid4()}",
+            expires_in=LOCAL_SESSION_SECONDS,
+            expires_at=int(time.time()) + LOCAL_SESSION_SECONDS,
+        )
+
+    def sign_in_with_id_token(self, credentials):
+        session = self._session()
+        return SimpleNamespace(session=session, user=None)
+
+    def refresh_session(self, refresh_token=None):
+        session = self._session()
+        return SimpleNamespace(session=session, user=None)
+
+    def set_session(self, access_token, refresh_token):
+        return self.refresh_session(refresh_token)
+
+
+class LocalClient:
+    def __init__(self, db):
+        self.db = db
+        self.auth = LocalAuth()
+
+    def table(self, name):
+        return LocalQuery(self.db, name)
+
+    from_ = table
+
+    def rpc(self, name, params=None, **_):
+        return LocalRpc(self.db, name, params)
+
+
+_default_db = None
+_default_db_lock = threading.Lock()
+
+
+def get_local_database() -> LocalDatabase:
+    """The process-wide database every LocalClient shares (seeded on first use)."""
+    global _default_db
+    with _default_db_lock:
+        if _default_db is None:
+            db = LocalDatabase(latency_ms=float(os.environ.get(LATENCY_ENV, "0") or 0))
+            seed_path = os.environ.get(SEED_PATH_ENV)
+            if seed_path:
+                with open(seed_path, encoding="utf-8") as f:
+                    db.seed(json.load(f))
+            _default_db = db
+        return _default_db
+
+
+def create_local_client(db: LocalDatabase | None = None) -> LocalClient:
+    return LocalClient(db or get_local_database())
@@ -7,8 +7,11 @@ from helpers import (
     get_authenticated_supabase,
     members_to_dataframe,
     sanitize_text,
-    verify_microsoft_id_token,
+    require_auth_context,
     apply_member_updates,
+    get_editor_edited_rows,
+    invalidate_capacity_snapshot,
+    save_member,
     hide_sidebar,
     back_button,
     remove_st_branding
@@ -22,49 +25,11 @@ remove_st_branding()
 hide_sidebar()
 
 # -----------------------------------------------------
-# 1) CHECK IF USER IS LOGGED IN
+# 1) Resolve the logged-in user
 # -----------------------------------------------------
-if "token" not in st.session_state or not st.session_state["token"]:
-    st.error("✖ You must be logged in to access this page.")
-    back_button("Home.py")
-    st.write("---")
-    st.stop()
-
-token = st.session_state["token"]
-
-if "id_token" not in token:
-    st.error("✖ Invalid login session. Please sign in again.")
-    back_button("Home.py")
-    st.write("---")
-    st.stop()
-
-# -----------------------------------------------------
-# 2) Decode Microsoft Token
-# -----------------------------------------------------
-try:
-    decoded = verify_microsoft_id_token(token["id_token"])
-except Exception:
-    st.error("✖ Invalid login session. Please sign in again.")
-    back_button("Home.py")
-    st.write("---")
-    st.stop()
-
-raw_name = decoded.get("name", "")
-user_email = (
-    decoded.get("preferred_username")
-    or decoded.get("email")
-    or decoded.get("upn")
-    or ""
-).lower()
-
-if "," in raw_name:
-    last, first = [x.strip() for x in raw_name.split(",", 1)]
-    user_name = f"{first} {last}"
-else:
-    user_name = raw_name.strip()
-
-st.session_state["user_email"] = user_email
-st.session_state["user_name"] = user_name
+auth = require_auth_context()
+user_email = auth.email_key
+user_name = auth.user_name
 
 # -----------------------------------------------------
 # 3) Load current user → team
@@ -195,7 +160,10 @@ if is_volunteer_only:
     edited_volunteer["id"] = df_self["id"]
     original_volunteer = df_self[["id"] + volunteer_only_columns].copy()
 
-    applied_volunteer = apply_member_updates(edited_volunteer, original_volunteer, team_name_to_id, client)
+    applied_volunteer = apply_member_updates(
+        edited_volunteer, original_volunteer, team_name_to_id, client,
+        edited_rows=get_editor_edited_rows("volunteer_only_editor"),
+    )
     if applied_volunteer > 0:
         st.success("Saved.")
         st.rerun()
@@ -212,6 +180,7 @@ if is_volunteer_only:
         try:
             updated_value = ", ".join(selected_areas) if selected_areas else None
             client.table("members").update({"volunteering_area": updated_value}).eq("id", current_user.get("id")).execute()
+            invalidate_capacity_snapshot()
             st.success("Saved.")
             st.rerun()
         except Exception as e:
@@ -283,7 +252,10 @@ edited_self = st.data_editor(
 edited_self["id"] = df_self_ids["id"]
 original_self = df_self_ids.copy()
 
-applied_self = apply_member_updates(edited_self, original_self, team_name_to_id, client)
+applied_self = apply_member_updates(
+    edited_self, original_self, team_name_to_id, client,
+    edited_rows=get_editor_edited_rows("self_editor"),
+)
 if applied_self > 0:
     st.success("Saved.")
     st.rerun()
@@ -310,6 +282,7 @@ if walking_fields_present and not is_volunteer_only:
         try:
             updated_value = ", ".join(selected_areas) if selected_areas else None
             client.table("members").update({"volunteering_area": updated_value}).eq("id", current_user.get("id")).execute()
+            invalidate_capacity_snapshot()
             st.success("Saved.")
             st.rerun()
         except Exception as e:
@@ -365,32 +338,21 @@ if not team_id:
 
             if st.button("Join Team"):
                 try:
-                    team_row = (
-                        client.table("teams")
-                        .select("id, on_waiting_list")
-                        .eq("id", selected_team_id)
-                        .limit(1)
-                        .execute()
-                        .data
-                        or []
+                    status, _ = save_member(
+                        client,
+                        {"team_id": selected_team_id, "role": "Member"},
+                        current_user.get("id"),
+                        allow_waiting_team=False,
                     )
-                    if not team_row or team_row[0].get("on_waiting_list") is True:
+                    if status == "team_unavailable":
                         st.error("That team is no longer available.")
                         st.stop()
-
-                    latest_res = (
-                        client.table("members")
-                        .select("id", count="exact")
-                        .eq("team_id", selected_team_id)
-                        .execute()
-                    )
-                    latest_count = latest_res.count or 0
-
-                    if latest_count >= 5:
+                    if status == "team_full":
                         st.error("This team is now full. Please select another team.")
                         st.stop()
+                    if status != "saved":
+                        raise RuntimeError(f"Join failed: {status}")
 
-                    client.table("members").update({"team_id": selected_team_id, "role": "Member"}).eq("id", current_user.get("id")).execute()
                     st.success("Joined team.")
                     st.rerun()
                 except Exception as e:
@@ -534,6 +496,7 @@ if is_team_leader:
             if st.button("Remove Member", disabled=not confirm_remove):
                 try:
                     client.table("members").update({"team_id": None}).eq("id", selected_member["id"]).execute()
+                    invalidate_capacity_snapshot()
                     st.success("Member removed from the team.")
                     st.rerun()
                 except Exception as e:
@@ -7,8 +7,8 @@ from helpers import (
     get_authenticated_supabase,
     prepare_member_record,
     hide_sidebar,
-    get_active_walker_count,
-    get_active_volunteer_count,
+    get_capacity_snapshot,
+    invalidate_capacity_snapshot,
     sanitize_text,
     remove_st_branding,
 )
@@ -141,12 +141,15 @@ except Exception:
     pass
 
 # Check if event is full for either hikers or volunteers - SET CAPACITY HERE
-current_hiker_count = get_active_walker_count(client)
-hiker_capacity_reached = current_hiker_count >= 170 # This is MAX number of hikers allowed and should always be 5 * MAX_TEAMS
+MAX_HIKERS = 170 # This is MAX number of hikers allowed and should always be 5 * MAX_TEAMS
+MAX_VOLUNTEERS = 20
+
+capacity = get_capacity_snapshot(client)
+current_hiker_count = capacity.walkers
+hiker_capacity_reached = current_hiker_count >= MAX_HIKERS
 
 # Check if volunteer capacity is reached
-current_volunteer_count = get_active_volunteer_count(client)
-MAX_VOLUNTEERS = 20
+current_volunteer_count = capacity.volunteers
 volunteer_capacity_reached = current_volunteer_count >= MAX_VOLUNTEERS
 
 # Only apply waiting list logic for hikers (Walking or Both), not pure volunteers
@@ -210,6 +213,11 @@ if submitted:
     })
     st.session_state["draft"] = draft
 
+    # The warnings above use the cached snapshot; place on the waiting list using live counts
+    capacity = get_capacity_snapshot(client, refresh=True)
+    hiker_capacity_reached = capacity.walkers >= MAX_HIKERS
+    volunteer_capacity_reached = capacity.volunteers >= MAX_VOLUNTEERS
+
     # Re-check for existing user with updated email
     submitted_email = draft.get("employee_email", "").lower()
     user_exists = False
@@ -233,7 +241,7 @@ if submitted:
     # ===================================================================
     # REGISTRATION LOGIC - Handle different scenarios based on capacity
     # ===================================================================
-    
+
     # SCENARIO 1: Volunteer capacity reached for NEW pure volunteers
     if volunteer_capacity_reached and is_volunteer_only and not user_exists:
         # NEW VOLUNTEER + VOLUNTEER CAPACITY REACHED ⇒ Add to waiting list
@@ -241,6 +249,7 @@ if submitted:
         final_record = prepare_member_record(draft, True, client)
         try:
             res = client.table("members").insert(final_record).execute()
+            invalidate_capacity_snapshot()
             new_id = res.data[0]["id"]
             st.session_state["member_id"] = new_id
             st.success("Thank you for registering!")
@@ -263,6 +272,7 @@ if submitted:
         final_record = prepare_member_record(draft, True, client)
         try:
             res = client.table("members").insert(final_record).execute()
+            invalidate_capacity_snapshot()
             new_id = res.data[0]["id"]
             st.session_state["member_id"] = new_id
             st.success("Thank you for registering!")
@@ -240,8 +240,8 @@ Members: **{count}**
                 st.progress(min(count / 5, 1.0))
 
                 if st.button(f"Select {tn}", key=f"join_{tid}"):
-
-                    # Live capacity check
+                    # Live capacity check (advisory: gives early feedback; the
+                    # limit itself is enforced when the registration is saved)
                     try:
                         latest_res = (
                             client.table("members")
@@ -3,17 +3,13 @@ import streamlit as st
 from uuid import uuid4
 from streamlit.components.v1 import html
 import matplotlib.pyplot as plt
-import folium
 
 from helpers import (
     init_page,
     hide_sidebar,
     back_button,
-    load_gpx_points,
-    compute_track_stats,
-    trim_outliers,
-    expanded_bounds,
-    mid_route_center,
+    load_route,
+    get_route_map_html,
     remove_st_branding,
 )
 
@@ -146,9 +142,9 @@ with left:
 # Load GPX + compute stats
 # -------------------------
 gpx_path = ROUTE_FILES[selected_route]["default_path"]
-points_raw = load_gpx_points(gpx_path)
+route = load_route(gpx_path)
 
-if not points_raw:
+if route is None:
     with left:
         st.error(
             f"GPX for **{selected_route}** not found or unreadable at `{gpx_path}`.\n"
@@ -177,7 +173,7 @@ if not points_raw:
                 st.success("Route saved!")
                 st.switch_page("pages/6_Logistics.py")
 else:
-    stats_raw = compute_track_stats(points_raw)
+    stats_raw = route.stats_raw
 
     ascent_show = (
         stats_raw["ascent_m"]
@@ -186,9 +182,6 @@ else:
     )
     ascent_text = f"{int(ascent_show)} m" if ascent_show else "—"
 
-    points_trim = trim_outliers(points_raw, q=0.01)
-    stats_trim = compute_track_stats(points_trim)
-
     with left:
         # Distance card (UPDATED)
         st.markdown(f"""
@@ -215,11 +208,9 @@ else:
             """, unsafe_allow_html=True)
 
         try:
-            with open(gpx_path, "rb") as f:
-                gpx_bytes = f.read()
             st.download_button(
                 "⬇ Download Route (GPX)",
-                data=gpx_bytes,
+                data=route.gpx_bytes,
                 file_name=f"{selected_route.lower()}_route.gpx",
                 mime="application/gpx+xml",
             )
@@ -269,27 +260,9 @@ else:
 
     with right:
         MAP_HEIGHT = 800
-        coords_raw = [(lat, lon) for (lat, lon, _ele) in points_raw]
-
-        min_lat, min_lon, max_lat, max_lon = expanded_bounds(points_raw, margin_frac=0.08)
-        centre_latlon = mid_route_center(points_trim, stats_trim["cum_dist_km"])
 
         try:
-            m = folium.Map(location=centre_latlon, zoom_start=13, tiles="OpenTopoMap")
-
-            folium.PolyLine(
-                coords_raw,
-                color="#6A307D",
-                weight=9,
-                opacity=0.95
-            ).add_to(m)
-
-            folium.Marker(coords_raw[0], popup="Start", icon=folium.Icon(color="green")).add_to(m)
-            folium.Marker(coords_raw[-1], popup="End", icon=folium.Icon(color="red")).add_to(m)
-
-            m.fit_bounds([[min_lat, min_lon], [max_lat, max_lon]])
-
-            html(m._repr_html_(), height=MAP_HEIGHT)
+            html(get_route_map_html(gpx_path), height=MAP_HEIGHT)
         except Exception as e:
             st.error(f"Map render error: {e}")
 
@@ -1,6 +1,6 @@
 # pages/5_Review.py
 import streamlit as st
-from helpers import init_page, get_authenticated_supabase, prepare_member_record, hide_sidebar, back_button, remove_st_branding, get_active_on_day_volunteer_count
+from helpers import init_page, get_authenticated_supabase, prepare_member_record, hide_sidebar, back_button, remove_st_branding, get_capacity_snapshot, create_team, save_member, discard_new_team, admission
 
 init_page("Step 7: Review & Submit")
 
@@ -117,7 +117,17 @@ if submit_disabled and cooldown_remaining > 0:
 
 submit = st.button("✔ Confirm & Submit", disabled=submit_disabled)
 
+def discard_created_team():
+    # A team created by this submit but never joined would be left empty.
+    # Called before st.stop(): once a stop is requested, later Streamlit calls raise.
+    if created_team_id is not None:
+        discard_new_team(client, created_team_id)
+        draft["team_id"] = None
+        st.session_state["draft"] = draft
+
+
 if submit:
+    created_team_id = None
     try:
         # Lock submission so they cannot click twice
         st.session_state["submission_in_progress"] = True
@@ -125,92 +135,81 @@ if submit:
         # Record this attempt timestamp
         st.session_state["last_submit_time"] = time.time()
 
-        # Check existing user
-        employee_email = draft.get("employee_email", "").lower()
-        existing = (
-            client.table("members")
-            .select("id")
-            .eq("employee_email", employee_email)
-            .execute()
-        )
-        existing_member = existing.data[0] if existing.data else None
-
-        # Deferred team creation (avoid orphan teams from incomplete registrations)
-        if (draft.get("team_action") == "create") and (draft.get("team_id") is None):
-            team_name = (draft.get("team_name") or "").strip()
-            team_route = (draft.get("team_route") or "").strip()
-            if not team_name or not team_route:
-                st.error("Team details are missing. Please return to the Team step.")
-                st.stop()
-
-            dup = (
-                client.table("teams")
+        with admission("submit"):
+            # Check existing user
+            employee_email = draft.get("employee_email", "").lower()
+            existing = (
+                client.table("members")
                 .select("id")
-                .eq("team_name", team_name)
-                .limit(1)
+                .eq("employee_email", employee_email)
                 .execute()
             )
-            if dup.data:
-                st.error("A team with that name already exists. Please return to the Team step and choose another name.")
+            existing_member = existing.data[0] if existing.data else None
+
+            # Deferred team creation (avoid orphan teams from incomplete registrations)
+            if (draft.get("team_action") == "create") and (draft.get("team_id") is None):
+                team_name = (draft.get("team_name") or "").strip()
+                team_route = (draft.get("team_route") or "").strip()
+                if not team_name or not team_route:
+                    st.error("Team details are missing. Please return to the Team step.")
+                    st.stop()
+
+                status, created_team = create_team(client, team_name, team_route)
+                if status == "duplicate":
+                    st.error("A team with that name already exists. Please return to the Team step and choose another name.")
+                    st.stop()
+
+                if not created_team or not created_team.get("id"):
+                    st.error("Could not create the team. Please try again.")
+                    st.stop()
+
+                created_team_id = created_team.get("id")
+                draft["team_id"] = created_team_id
+                st.session_state["draft"] = draft
+
+            # On-the-day volunteer cap
+            on_day_tokens = {
+                "Setting up the DXC tent and Merch distrubition",
+                "Participant support on the day",
+            }
+            volunteering_areas = draft.get("volunteering_area_selection")
+            if isinstance(volunteering_areas, list):
+                volunteering_areas_text = ", ".join([a for a in volunteering_areas if str(a).strip()])
+            else:
+                volunteering_areas_text = ""
+            if not volunteering_areas_text:
+                volunteering_areas_text = draft.get("volunteering_area") or ""
+
+            wants_on_day = any(t in (volunteering_areas_text or "") for t in on_day_tokens)
+            exclude_id = str(existing_member.get("id")) if existing_member else None
+            current_on_day_count = get_capacity_snapshot(client, refresh=True).on_day_volunteer_count(exclude_id)
+
+            on_waiting_list = False
+            if wants_on_day and current_on_day_count >= 20:
+                on_waiting_list = True
+                st.info("On-the-day volunteer roles are currently full. You have been placed on the waiting list.")
+
+            # Prepare and sanitize final record
+            final_record = prepare_member_record(draft, on_waiting_list, client)
+
+            # Insert or update
+            member_id = existing_member["id"] if existing_member else None
+            status, saved_member = save_member(client, final_record, member_id)
+            if status != "saved" or not saved_member:
+                discard_created_team()
+            if status == "team_full":
+                st.error("This team is now full. Please return to the Team step and choose another team.")
                 st.stop()
-
-            MAX_TEAMS = 34
-            team_count_res = client.table("teams").select("id", count="exact").execute()
-            team_cap_reached = (team_count_res.count or 0) >= MAX_TEAMS
-
-            insert_res = client.table("teams").insert({
-                "team_name": team_name,
-                "route": team_route,
-                "on_waiting_list": bool(team_cap_reached),
-            }).execute()
-
-            created_team = insert_res.data[0] if insert_res.data else None
-            if not created_team or not created_team.get("id"):
-                st.error("Could not create the team. Please try again.")
+            if status != "saved" or not saved_member:
+                st.error("Could not save your registration. Please try again.")
                 st.stop()
+            st.session_state["member_id"] = saved_member["id"]
 
-            draft["team_id"] = created_team.get("id")
-            st.session_state["draft"] = draft
-
-        # On-the-day volunteer cap
-        on_day_tokens = {
-            "Setting up the DXC tent and Merch distrubition",
-            "Participant support on the day",
-        }
-        volunteering_areas = draft.get("volunteering_area_selection")
-        if isinstance(volunteering_areas, list):
-            volunteering_areas_text = ", ".join([a for a in volunteering_areas if str(a).strip()])
-        else:
-            volunteering_areas_text = ""
-        if not volunteering_areas_text:
-            volunteering_areas_text = draft.get("volunteering_area") or ""
-
-        wants_on_day = any(t in (volunteering_areas_text or "") for t in on_day_tokens)
-        exclude_id = str(existing_member.get("id")) if existing_member else None
-        current_on_day_count = get_active_on_day_volunteer_count(client, exclude_member_id=exclude_id)
-
-        on_waiting_list = False
-        if wants_on_day and current_on_day_count >= 20:
-            on_waiting_list = True
-            st.info("On-the-day volunteer roles are currently full. You have been placed on the waiting list.")
-
-        # Prepare and sanitize final record
-        final_record = prepare_member_record(draft, on_waiting_list, client)
-
-        # Insert or update
-        if existing_member is None:
-            res = client.table("members").insert(final_record).execute()
-            new_id = res.data[0]["id"]
-            st.session_state["member_id"] = new_id
-        else:
-            member_id = existing_member["id"]
-            client.table("members").update(final_record).eq("id", member_id).execute()
-            st.session_state["member_id"] = member_id
-
-        st.success("Registration confirmed!")
-        st.switch_page("pages/8_Thanks.py")
+            st.success("Registration confirmed!")
+            st.switch_page("pages/8_Thanks.py")
 
     except Exception as e:
+        discard_created_team()
         st.error("Could not complete your registration.")
         st.exception(e)
 
@@ -1,22 +1,14 @@
 import streamlit as st
-from helpers import hide_sidebar, remove_st_branding, apply_header_font
-from pathlib import Path
-import base64
+from helpers import hide_sidebar, remove_st_branding, apply_header_font, get_page_icon, get_background_image_url
 
 hide_sidebar()
 remove_st_branding()
 apply_header_font()
 
-BASE_DIR = Path(__file__).resolve().parents[1]
-ASSETS_DIR = BASE_DIR / "assets"
-LOGO_PATH = ASSETS_DIR / "WWTW_2025.jpg"
-ICON_PATH = ASSETS_DIR / "page_icon.png"
+st.set_page_config(page_icon=get_page_icon(), layout="wide")
 
-st.set_page_config(page_icon= ICON_PATH, layout="wide")
-
-    # Convert image to base64
-with open(LOGO_PATH, "rb") as img_file:
-    encoded = base64.b64encode(img_file.read()).decode()
+bg_url = get_background_image_url()
+bg_layer = f', url("{bg_url}")' if bg_url else ""
 
 st.markdown(
         f"""
@@ -28,8 +20,7 @@ st.markdown(
 
         .stApp {{
             background-image:
-                linear-gradient(rgba(0,0,0,0.4), rgba(0,0,0,0.4)),
-                url("data:image/jpg;base64,{encoded}");
+                linear-gradient(rgba(0,0,0,0.4), rgba(0,0,0,0.4)){bg_layer};
             background-size: cover;
             background-position: center;
             background-repeat: no-repeat;
@@ -1,20 +1,27 @@
 import streamlit as st
 import pandas as pd
-import math
+from functools import partial
+from streamlit.errors import StreamlitAPIException
 
 from helpers import (
     init_page,
     require_access,
     get_authenticated_supabase,
-    verify_microsoft_id_token,
+    require_auth_context,
     members_to_dataframe,
+    build_member_index,
+    lazy_expander,
     apply_member_updates,
-    export_excel,
+    get_editor_edited_rows,
+    diff_frames,
+    bulk_update,
+    get_excel_export,
     delete_team,
     delete_member,
     hide_sidebar,
     back_button,
-    remove_st_branding
+    remove_st_branding,
+    render_query_log_panel,
 )
 
 # -----------------------------------------------------
@@ -25,52 +32,9 @@ remove_st_branding()
 hide_sidebar()
 
 # -----------------------------------------------------
-# 1) CHECK IF USER IS LOGGED IN (from home.py)
+# 1) Resolve the logged-in user
 # -----------------------------------------------------
-if "token" not in st.session_state or st.session_state["token"] is None:
-    st.error("✖ You must be logged in to access the Admin Panel.")
-    back_button("Home.py")
-    st.write("---")
-    st.stop()
-
-token = st.session_state["token"]
-
-# If somehow token exists but no id_token → treat as not logged in
-if "id_token" not in token:
-    st.error("✖ Invalid login session. Please sign in again.")
-    back_button("Home.py")
-    st.write("---")
-    st.stop()
-
-# -----------------------------------------------------
-# 2) Decode Microsoft Token (same as home.py)
-# -----------------------------------------------------
-try:
-    decoded = verify_microsoft_id_token(token["id_token"])
-except Exception:
-    st.error("✖ Invalid login session. Please sign in again.")
-    back_button("Home.py")
-    st.write("---")
-    st.stop()
-
-raw_name = decoded.get("name", "Unknown User")
-user_email = (
-    decoded.get("preferred_username")
-    or decoded.get("email")
-    or decoded.get("upn")
-    or decoded.get("unique_name")
-    or ""
-)
-
-# Convert “Lastname, Firstname” format if needed
-if "," in raw_name:
-    last, first = [x.strip() for x in raw_name.split(",", 1)]
-    user_name = f"{first} {last}"
-else:
-    user_name = raw_name.strip()
-
-st.session_state["user_name"] = user_name
-st.session_state["user_email"] = user_email
+require_auth_context("✖ You must be logged in to access the Admin Panel.")
 
 # Access control and sidebar
 user_email, user_name, is_admin = require_access()
@@ -103,43 +67,77 @@ member_select_cols = (
 all_members = client.table("members").select(member_select_cols).execute().data or []
 valid_team_ids = set(team_id_to_name.keys())
 
-active_counts = {}
-for m in all_members:
-    if bool(m.get("on_waiting_list")):
-        continue
-    tid = m.get("team_id")
-    if tid is None:
-        continue
-    if tid not in valid_team_ids:
-        continue
-    active_counts[tid] = active_counts.get(tid, 0) + 1
-
-waiting_members = [m for m in all_members if bool(m.get("on_waiting_list"))]
-
-_unassigned_members_raw = [
-    m
-    for m in all_members
-    if not bool(m.get("on_waiting_list"))
-    and (m.get("team_id") is None or m.get("team_id") not in valid_team_ids)
-]
+# One pass over the members; every section below reads its bucket from here
+member_index = build_member_index(all_members, valid_team_ids)
+active_counts = member_index.active_counts
 
-volunteer_members = [
-    m
-    for m in all_members
-    if not bool(m.get("on_waiting_list"))
-    and (m.get("volunteering_area") or "").strip()
-]
+waiting_members = member_index.waiting
+unassigned_members = member_index.unassigned
+volunteer_members = member_index.volunteers
 
-unassigned_members = [
-    m
-    for m in _unassigned_members_raw
-    if not (m.get("volunteering_area") or "").strip()
-]
+
+# -----------------------------------------------------
+# Section Reruns: each section is a fragment with its own refetch
+# -----------------------------------------------------
+SECTION_ROWS_KEY = "admin_section_rows"
+STALE_SECTIONS_KEY = "admin_stale_sections"
+
+# Edits to these columns move members into other sections, so they rerun the page
+MEMBER_SECTION_COLUMNS = {"Team Name", "On Waiting List", "Volunteering Area"}
+TEAM_SECTION_COLUMNS = {"On Waiting List"}
+
+# A full run has just loaded everything; drop rows refetched by earlier section reruns
+st.session_state[SECTION_ROWS_KEY] = {}
+st.session_state[STALE_SECTIONS_KEY] = set()
+
+
+def fetch_members(**filters):
+    query = client.table("members").select(member_select_cols)
+    for column, value in filters.items():
+        query = query.eq(column, value)
+    return query.execute().data or []
+
+
+def section_rows(section, rows, loader):
+    """Rows for `section`: from the full run, or refetched by `loader` after a write in it."""
+    refetched = st.session_state[SECTION_ROWS_KEY]
+    if section in st.session_state[STALE_SECTIONS_KEY]:
+        st.session_state[STALE_SECTIONS_KEY].discard(section)
+        refetched[section] = loader()
+    return refetched.get(section, rows)
+
+
+def rerun_section(section=None, moved=False):
+    """
+    Rerun after a write or a confirm/cancel click. Only the calling fragment
+    reruns (refetching `section` if given) unless rows moved between sections.
+    """
+    if not moved:
+        if section is not None:
+            st.session_state[STALE_SECTIONS_KEY].add(section)
+        try:
+            st.rerun(scope="fragment")
+        except StreamlitAPIException:
+            pass  # fragment ran as part of a full run
+    st.rerun()
+
+
+def edited_columns(editor_key):
+    """Columns touched in a data editor, or None when the delta is unavailable."""
+    edited_rows = get_editor_edited_rows(editor_key)
+    if edited_rows is None:
+        return None
+    return {col for cells in edited_rows.values() for col in cells}
+
+
+def moves_rows(editor_key, section_columns):
+    columns = edited_columns(editor_key)
+    return columns is None or bool(columns & section_columns)
 
 # -----------------------------------------------------
 # Utility: Member Editor Function
 # -----------------------------------------------------
-def render_member_editor(df_members, team_id_to_name, team_name_to_id, client, title, dropdowns, active_counts):
+def render_member_editor(df_members, team_id_to_name, team_name_to_id, client, title, dropdowns, active_counts, section=None):
     if df_members.empty:
         st.info(f"No members to display for {title}.")
         return
@@ -201,10 +199,13 @@ def render_member_editor(df_members, team_id_to_name, team_name_to_id, client, t
     edited["id"] = df_ids["id"]
 
     # ---- Apply updates ----
-    applied = apply_member_updates(edited, df_ids, team_name_to_id, client)
+    applied = apply_member_updates(
+        edited, df_ids, team_name_to_id, client,
+        edited_rows=get_editor_edited_rows(f"editor_{title}"),
+    )
     if applied > 0:
         st.success(f"Applied {applied} update(s).")
-        st.rerun()
+        rerun_section(section, moved=moves_rows(f"editor_{title}", MEMBER_SECTION_COLUMNS))
 
     member_options = {
         f"{row['Full Name']} — {row['Employee Email']}": row["id"]
@@ -242,16 +243,18 @@ def render_member_editor(df_members, team_id_to_name, team_name_to_id, client, t
 
         with confirm_cols[0]:
             if st.button("✔ Confirm", key=f"confirm_delete_yes_{title}", use_container_width=True):
-                delete_member(st.session_state[pending_key], client)
-                st.session_state[pending_key] = None
-                st.session_state.pop(f"delete_select_{title}", None)  # Clear selectbox state
-                st.rerun()
+                if delete_member(st.session_state[pending_key], client, rerun=False):
+                    st.session_state[pending_key] = None
+                    st.session_state.pop(f"delete_select_{title}", None)  # Clear selectbox state
+                    # The member may also be listed in other sections (a team and
+                    # Volunteers) and counts team places, so the whole page reruns
+                    rerun_section(moved=True)
 
         with confirm_cols[1]:
             if st.button("✖ Cancel", key=f"confirm_delete_no_{title}", use_container_width=True):
                 st.session_state[pending_key] = None
                 st.session_state.pop(f"delete_select_{title}", None)  # Clear selectbox state
-                st.rerun()
+                rerun_section()
 
     st.markdown("---")
 
@@ -276,56 +279,22 @@ TEAM_COLUMN_MAP = {
 }
 
 
-def apply_team_updates(edited_df, original_df, client):
-    if edited_df is None or edited_df.empty:
+def apply_team_updates(edited_df, original_df, client, edited_rows=None):
+    change_set = {
+        team_id: {TEAM_COLUMN_MAP[col]: val for col, val in cells.items()}
+        for team_id, cells in diff_frames(edited_df, original_df, list(TEAM_COLUMN_MAP), edited_rows).items()
+    }
+    if not change_set:
         return 0
 
-    updates = 0
+    result = bulk_update(client, "teams", change_set)
+    for team_id, err in result.errors.items():
+        st.error(f"Failed to update team {team_id}: {err}")
 
-    original_df = original_df.copy()
-    edited_df = edited_df.copy()
-    original_df["id"] = original_df["id"].astype(str)
-    edited_df["id"] = edited_df["id"].astype(str)
+    return len(result.updated)
 
-    for _, row in edited_df.iterrows():
-        team_id = row["id"]
-        orig_rows = original_df[original_df["id"] == team_id]
-        if orig_rows.empty:
-            continue
-        orig = orig_rows.iloc[0]
 
-        changes = {}
-        for col, new_val in row.items():
-            if col == "id":
-                continue
-
-            old_val = orig[col]
-            db_col = TEAM_COLUMN_MAP.get(col)
-            if not db_col:
-                continue
-
-            if db_col == "on_waiting_list":
-                new_val = bool(new_val)
-                old_val = bool(old_val)
-
-            if new_val != old_val:
-                # Skip NaN values as they're not JSON compliant
-                if isinstance(new_val, float) and math.isnan(new_val):
-                    continue
-                changes[db_col] = new_val
-
-        if changes:
-            try:
-                client.table("teams").update(changes).eq("id", team_id).execute()
-                updates += 1
-            except Exception as e:
-                st.error(f"Failed to update team {team_id}.")
-                st.exception(e)
-
-    return updates
-
-
-def render_team_editor(df_teams, client, title, dropdowns, disabled_columns=None):
+def render_team_editor(df_teams, client, title, dropdowns, disabled_columns=None, section=None):
     if df_teams.empty:
         st.info(f"No teams to display for {title}.")
         return
@@ -351,10 +320,13 @@ def render_team_editor(df_teams, client, title, dropdowns, disabled_columns=None
 
     edited["id"] = df_ids["id"]
 
-    applied = apply_team_updates(edited, df_ids, client)
+    applied = apply_team_updates(
+        edited, df_ids, client,
+        edited_rows=get_editor_edited_rows(f"editor_{title}"),
+    )
     if applied > 0:
         st.success(f"Applied {applied} update(s).")
-        st.rerun()
+        rerun_section(section, moved=moves_rows(f"editor_{title}", TEAM_SECTION_COLUMNS))
 
     team_options = {
         f"{row['Team Name']} — {row['Route']}": row["id"]
@@ -386,6 +358,7 @@ def render_team_editor(df_teams, client, title, dropdowns, disabled_columns=None
 
         with confirm_cols[0]:
             if st.button("✔ Confirm", key=f"confirm_delete_yes_{title}", use_container_width=True):
+                # Members are unassigned, so the whole page reruns
                 delete_team(st.session_state[pending_key], client)
                 st.session_state[pending_key] = None
                 st.session_state.pop(f"delete_select_{title}", None)
@@ -395,7 +368,7 @@ def render_team_editor(df_teams, client, title, dropdowns, disabled_columns=None
             if st.button("✖ Cancel", key=f"confirm_delete_no_{title}", use_container_width=True):
                 st.session_state[pending_key] = None
                 st.session_state.pop(f"delete_select_{title}", None)
-                st.rerun()
+                rerun_section()
 
     st.markdown("---")
 
@@ -424,6 +397,39 @@ dropdowns = {
 
 }
 
+# -----------------------------------------------------
+# Member Sections
+# -----------------------------------------------------
+# Sections are lazy: a collapsed expander shows its label only, so each rerun
+# builds editors for the sections that are open rather than for the whole event.
+# Each section is also a fragment: opening it or editing it reruns that section
+# alone, with a refetch of just its rows. Deletes rerun the whole page.
+@st.fragment
+def member_section(section, label, rows, loader, title, empty_message, visible_cols=None, footer=None):
+    rows = section_rows(section, rows, loader)
+
+    expander = lazy_expander(label(rows), section)
+    with expander:
+        if not expander.open:
+            return
+
+        if rows:
+            df_section = members_to_dataframe(rows, team_id_to_name)
+            if visible_cols:
+                df_section = df_section[[c for c in visible_cols if c in df_section.columns]]
+            render_member_editor(df_section, team_id_to_name, team_name_to_id, client, title, dropdowns, active_counts, section)
+        else:
+            st.info(empty_message)
+
+        if footer:
+            footer()
+
+
+def load_active_bucket(bucket):
+    index = build_member_index(fetch_members(on_waiting_list=False), valid_team_ids)
+    return getattr(index, bucket)
+
+
 # -----------------------------------------------------
 # Particpant Waiting List
 # -----------------------------------------------------
@@ -431,12 +437,14 @@ st.markdown("---")
 st.subheader("Participant Waiting List")
 st.caption("Members added here when the event reaches capacity (200+ active participants). Manage these members below—edit their details or uncheck 'On Waiting List' to move them to active status. Delete members if needed.")
 
-with st.expander(f"Waiting List ({len(waiting_members)})", expanded=False):
-    if waiting_members:
-        df_wait = members_to_dataframe(waiting_members, team_id_to_name)
-        render_member_editor(df_wait, team_id_to_name, team_name_to_id, client, "Waiting List", dropdowns, active_counts)
-    else:
-        st.info("No users are currently on the waiting list.")
+member_section(
+    "waiting_list",
+    lambda rows: f"Waiting List ({len(rows)})",
+    waiting_members,
+    partial(fetch_members, on_waiting_list=True),
+    "Waiting List",
+    "No users are currently on the waiting list.",
+)
 
 # -----------------------------------------------------
 # Unassigned Members
@@ -445,12 +453,14 @@ st.markdown("---")
 st.subheader("Unassigned Members")
 st.caption("Participants who registered but are not part of any team. Assign them to teams using the 'Team Name' dropdown in the table, or delete them if needed. Teams accept up to 5 members each.")
 
-with st.expander(f"Unassigned Members ({len(unassigned_members)})"):
-    if unassigned_members:
-        df_un = members_to_dataframe(unassigned_members, team_id_to_name)
-        render_member_editor(df_un, team_id_to_name, team_name_to_id, client, "Unassigned", dropdowns, active_counts)
-    else:
-        st.info("All members are assigned to teams.")
+member_section(
+    "unassigned",
+    lambda rows: f"Unassigned Members ({len(rows)})",
+    unassigned_members,
+    partial(load_active_bucket, "unassigned"),
+    "Unassigned",
+    "All members are assigned to teams.",
+)
 
 
 # -----------------------------------------------------
@@ -460,28 +470,29 @@ st.markdown("---")
 st.subheader("Volunteers")
 st.caption("All members who have volunteered (both assigned and unassigned to teams). Manage volunteer personal details and volunteering areas below.")
 
-with st.expander(f"Volunteers ({len(volunteer_members)})"):
-    if volunteer_members:
-        df_volunteers = members_to_dataframe(volunteer_members, team_id_to_name)
-
-        volunteer_visible_cols = [
-            "id",
-            "Team Name",
-            "Role",
-            "Full Name",
-            "Employee Email",
-            "Employee ID",
-            "Mobile Number",
-            "Organisation",
-            "Forces Veteran",
-            "Volunteering Area",
-            "On Waiting List",
-        ]
-
-        df_volunteers = df_volunteers[[c for c in volunteer_visible_cols if c in df_volunteers.columns]]
-        render_member_editor(df_volunteers, team_id_to_name, team_name_to_id, client, "Volunteers", dropdowns, active_counts)
-    else:
-        st.info("No volunteers to display.")
+volunteer_visible_cols = [
+    "id",
+    "Team Name",
+    "Role",
+    "Full Name",
+    "Employee Email",
+    "Employee ID",
+    "Mobile Number",
+    "Organisation",
+    "Forces Veteran",
+    "Volunteering Area",
+    "On Waiting List",
+]
+
+member_section(
+    "volunteers",
+    lambda rows: f"Volunteers ({len(rows)})",
+    volunteer_members,
+    partial(load_active_bucket, "volunteers"),
+    "Volunteers",
+    "No volunteers to display.",
+    visible_cols=volunteer_visible_cols,
+)
 
 
 # -----------------------------------------------------
@@ -492,58 +503,61 @@ st.subheader("Confirmed Teams & Members")
 st.caption("View and manage all confirmed teams and their members. Edit participant details, reassign members to different teams, or delete entire teams (members will be unassigned). Each team can hold up to 5 members.")
 
 confirmed_team_count = len(teams_data)
-confirmed_member_count = sum(active_counts.values())
+confirmed_member_count = member_index.confirmed_member_count
 
 c1, c2 = st.columns(2)
 c1.metric("Confirmed Teams", confirmed_team_count)
 c2.metric("Members Assigned to Confirmed Teams", confirmed_member_count)
 
-for team in teams_data:
-    team_members = [
-        m for m in all_members
-        if (m.get("team_id") is not None)
-        and (str(m.get("team_id")) == str(team.get("id")))
-    ]
 
-    registration_status = "REGISTERED" if bool(team.get("officially_registered")) else ""
+def render_delete_team(team):
+    # Delete Team (with confirmation)
+    with st.container():
+        st.markdown("**Delete Team:**")
 
-    with st.expander(f"{team['team_name']} — Route: {team.get('route','')} ({len(team_members)}/5 Members) — {registration_status}"):
+        col1, col2 = st.columns([3, 1])
 
-        if team_members:
-            df_team = members_to_dataframe(team_members, team_id_to_name)
-            render_member_editor(df_team, team_id_to_name, team_name_to_id, client, team["team_name"], dropdowns, active_counts)
-        else:
-            st.info("No members assigned to this team.")
+        with col1:
+            st.write(team['team_name'])
 
-        # Delete Team (with confirmation)
-        with st.container():
-            st.markdown("**Delete Team:**")
+        with col2:
+            if st.button(f"⌦ Delete", key=f"del_team_btn_{team['id']}", use_container_width=True):
+                st.session_state["confirm_delete_team"] = team["id"]
 
-            col1, col2 = st.columns([3, 1])
+        # Confirmation dialog
+        if st.session_state.get("confirm_delete_team") == team["id"]:
+            st.error(f"⚠︎ Delete team '{team['team_name']}'? Members will be unassigned.")
 
-            with col1:
-                st.write(team['team_name'])
+            col_confirm, col_cancel = st.columns([1, 1])
 
-            with col2:
-                if st.button(f"⌦ Delete", key=f"del_team_btn_{team['id']}", use_container_width=True):
-                    st.session_state["confirm_delete_team"] = team["id"]
+            with col_confirm:
+                if st.button("✔ Confirm", key=f"confirm_yes_{team['id']}", use_container_width=True):
+                    # Members move to Unassigned, so the whole page reruns
+                    delete_team(team["id"], client)
+                    st.session_state["confirm_delete_team"] = None
+                    st.rerun()
 
-            # Confirmation dialog
-            if st.session_state.get("confirm_delete_team") == team["id"]:
-                st.error(f"⚠︎ Delete team '{team['team_name']}'? Members will be unassigned.")
+            with col_cancel:
+                if st.button("✖ Cancel", key=f"confirm_no_{team['id']}", use_container_width=True):
+                    st.session_state["confirm_delete_team"] = None
+                    rerun_section()
 
-                col_confirm, col_cancel = st.columns([1, 1])
 
-                with col_confirm:
-                    if st.button("✔ Confirm", key=f"confirm_yes_{team['id']}", use_container_width=True):
-                        delete_team(team["id"], client)
-                        st.session_state["confirm_delete_team"] = None
-                        st.rerun()
+def team_label(team, rows):
+    registration_status = "REGISTERED" if bool(team.get("officially_registered")) else ""
+    return f"{team['team_name']} — Route: {team.get('route','')} ({len(rows)}/5 Members) — {registration_status}"
 
-                with col_cancel:
-                    if st.button("✖ Cancel", key=f"confirm_no_{team['id']}", use_container_width=True):
-                        st.session_state["confirm_delete_team"] = None
-                        st.rerun()
+
+for team in teams_data:
+    member_section(
+        f"team_{team['id']}",
+        partial(team_label, team),
+        member_index.team_members(team.get("id")),
+        partial(fetch_members, team_id=team["id"]),
+        team["team_name"],
+        "No members assigned to this team.",
+        footer=partial(render_delete_team, team),
+    )
 
 
 # -----------------------------------------------------
@@ -553,14 +567,21 @@ st.markdown("---")
 st.subheader("Teams on the Waiting List")
 st.caption("View and manage all teams on the waiting list.")
 
-unassigned_teams_data = (
-    client.table("teams")
-    .select("id, team_name, route, on_waiting_list")
-    .eq("on_waiting_list", True)
-    .execute()
-    .data
-    or []
-)
+waiting_team_cols = "id, team_name, route, on_waiting_list"
+
+
+def fetch_waiting_teams():
+    return (
+        client.table("teams")
+        .select(waiting_team_cols)
+        .eq("on_waiting_list", True)
+        .execute()
+        .data
+        or []
+    )
+
+
+unassigned_teams_data = fetch_waiting_teams()
 
 team_waiting_dropdowns = {
     "Team Leader": st.column_config.TextColumn("Team Leader"),
@@ -569,57 +590,68 @@ team_waiting_dropdowns = {
     "On Waiting List": st.column_config.CheckboxColumn("On Waiting List"),
 }
 
-with st.expander(f"Teams on Waiting List ({len(unassigned_teams_data)})", expanded=False):
-    if unassigned_teams_data:
-        waiting_team_ids = [str(t.get("id")) for t in (unassigned_teams_data or []) if t.get("id") is not None]
-        leader_by_team_id = {}
-
-        if waiting_team_ids:
-            try:
-                leader_rows = (
-                    client.table("members")
-                    .select("team_id, full_name, role")
-                    .in_("team_id", waiting_team_ids)
-                    .execute()
-                    .data
-                    or []
-                )
-                for r in leader_rows:
-                    if str((r.get("role") or "")).strip().lower() == "leader":
-                        leader_by_team_id[str(r.get("team_id"))] = r.get("full_name")
-            except Exception:
-                leader_by_team_id = {}
-
-        df_waiting_teams = teams_to_dataframe(unassigned_teams_data)
-        df_waiting_teams["Team Leader"] = df_waiting_teams["id"].map(lambda tid: leader_by_team_id.get(str(tid), ""))
-        cols = ["id", "Team Leader", "Team Name", "Route", "On Waiting List"]
-        df_waiting_teams = df_waiting_teams[[c for c in cols if c in df_waiting_teams.columns]]
-
-        render_team_editor(
-            df_waiting_teams,
-            client,
-            "WaitingListTeams",
-            team_waiting_dropdowns,
-            disabled_columns=["Team Leader"],
-        )
-    else:
-        st.info("No teams are currently on the waiting list.")
+
+def render_waiting_teams(unassigned_teams_data):
+    waiting_team_ids = [str(t.get("id")) for t in (unassigned_teams_data or []) if t.get("id") is not None]
+    leader_by_team_id = {}
+
+    # Leaders come from the member index, so opening this section costs no query
+    for tid in waiting_team_ids:
+        for m in member_index.team_members(tid):
+            if str((m.get("role") or "")).strip().lower() == "leader":
+                leader_by_team_id[tid] = m.get("full_name")
+
+    df_waiting_teams = teams_to_dataframe(unassigned_teams_data)
+    df_waiting_teams["Team Leader"] = df_waiting_teams["id"].map(lambda tid: leader_by_team_id.get(str(tid), ""))
+    cols = ["id", "Team Leader", "Team Name", "Route", "On Waiting List"]
+    df_waiting_teams = df_waiting_teams[[c for c in cols if c in df_waiting_teams.columns]]
+
+    render_team_editor(
+        df_waiting_teams,
+        client,
+        "WaitingListTeams",
+        team_waiting_dropdowns,
+        disabled_columns=["Team Leader"],
+        section="waiting_teams",
+    )
+
+
+@st.fragment
+def waiting_teams_section(unassigned_teams_data):
+    unassigned_teams_data = section_rows("waiting_teams", unassigned_teams_data, fetch_waiting_teams)
+
+    expander = lazy_expander(f"Teams on Waiting List ({len(unassigned_teams_data)})", "waiting_teams")
+    with expander:
+        if not expander.open:
+            return
+
+        if unassigned_teams_data:
+            render_waiting_teams(unassigned_teams_data)
+        else:
+            st.info("No teams are currently on the waiting list.")
+
+
+waiting_teams_section(unassigned_teams_data)
 
 
 # -----------------------------------------------------
 # EXPORT BUTTON
 # -----------------------------------------------------
-excel_file = export_excel(client)
-
 st.markdown("---")
 st.subheader("Export Data")
 st.caption("Download a comprehensive Excel file (.xlsx) containing all participants, sorted by team and waiting list status. Use this for reporting, planning, or offline record-keeping.")
 
 st.download_button(
     label="Export & Download Teams.xlsx",
-    data=excel_file.getvalue(),
+    # Built on click (and cached per data version), not on every Admin rerun
+    data=partial(get_excel_export, client),
     file_name="teams.xlsx",
     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    on_click="ignore",
 )
 
 back_button("Home.py")
+
+# Supabase round trips made by this render (admins only)
+if is_admin:
+    render_query_log_panel()
@@ -12,6 +12,44 @@ import os
 # Streamlit app URL from environment variable (or default)
 STREAMLIT_URL = os.environ.get("STREAMLIT_APP_URL", "https://wwtw-registration.streamlit.app/")
 
+# Upper bound on how long to wait for the app to report its cache warm-up (the app itself gives up after 120s)
+WARMUP_TIMEOUT = int(os.environ.get("STREAMLIT_WARMUP_TIMEOUT", "180"))
+
+WARMUP_STATUS_XPATH = "//*[starts-with(normalize-space(text()),'Warm-up ')]"
+
+
+def find_warm_up_status(driver):
+    """Return the app's warm-up status text, looking inside the app iframe when there is one."""
+    driver.switch_to.default_content()
+    frames = [None] + driver.find_elements(By.TAG_NAME, "iframe")
+    for frame in frames:
+        if frame is not None:
+            driver.switch_to.default_content()
+            driver.switch_to.frame(frame)
+        found = driver.find_elements(By.XPATH, WARMUP_STATUS_XPATH)
+        if found:
+            return found[0].text.strip()
+    return False
+
+
+def trigger_warm_up(driver):
+    """Open the app's ?warmup page, which starts the cache warm-up and reports when it has finished."""
+    driver.get(f"{STREAMLIT_URL.rstrip('/')}/?warmup=1")
+    print("App session opened, waiting for cache warm-up...")
+    try:
+        status = WebDriverWait(driver, WARMUP_TIMEOUT, poll_frequency=2).until(find_warm_up_status)
+    except TimeoutException:
+        print(f"No warm-up result after {WARMUP_TIMEOUT}s ❌")
+        exit(1)
+    finally:
+        driver.switch_to.default_content()
+
+    if status == "Warm-up complete":
+        print("Cache warm-up complete ✅")
+    else:
+        print(f"{status} ❌")
+        exit(1)
+
 def main():
     options = Options()
     options.add_argument('--headless=new')
@@ -47,6 +85,8 @@ def main():
             # No button at all → app is assumed to be awake
             print("No wake-up button found. Assuming app is already awake ✅")
 
+        trigger_warm_up(driver)
+
     except Exception as e:
         print(f"Unexpected error: {e}")
         exit(1)
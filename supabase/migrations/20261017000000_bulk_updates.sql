@@ -0,0 +1,68 @@
+-- Bulk partial updates used by helpers.bulk_update (admin data editors).
+--
+-- p_changes is a JSON array of {"id": <row id>, "changes": {<column>: <value>, ...}}.
+-- Each row keeps its current values for columns not present in "changes"
+-- (jsonb_populate_record overlays the JSON onto the existing row). The whole
+-- batch runs as one statement, so it either applies completely or not at all.
+
+create or replace function public.bulk_update_members(p_changes jsonb)
+returns integer
+language plpgsql
+security invoker
+as $$
+declare
+    updated integer;
+begin
+    update public.members as m
+    set (
+        team_id, role, full_name, organisation, employee_id, employee_email,
+        mobile_number, volunteering_area, preferred_route, shirt_size,
+        travelling_from, forces_vet, camping_fri, camping_sat, taking_car,
+        hiking_experience, notes, on_waiting_list
+    ) = (
+        select
+            r.team_id, r.role, r.full_name, r.organisation, r.employee_id, r.employee_email,
+            r.mobile_number, r.volunteering_area, r.preferred_route, r.shirt_size,
+            r.travelling_from, r.forces_vet, r.camping_fri, r.camping_sat, r.taking_car,
+            r.hiking_experience, r.notes, r.on_waiting_list
+        from jsonb_populate_record(m, c.value -> 'changes') as r
+    )
+    from jsonb_array_elements(p_changes) as c
+    where m.id::text = c.value ->> 'id';
+
+    get diagnostics updated = row_count;
+    if updated <> jsonb_array_length(p_changes) then
+        raise exception 'bulk_update_members: expected % rows, updated %',
+            jsonb_array_length(p_changes), updated;
+    end if;
+    return updated;
+end;
+$$;
+
+create or replace function public.bulk_update_teams(p_changes jsonb)
+returns integer
+language plpgsql
+security invoker
+as $$
+declare
+    updated integer;
+begin
+    update public.teams as t
+    set (team_name, route, on_waiting_list, officially_registered) = (
+        select r.team_name, r.route, r.on_waiting_list, r.officially_registered
+        from jsonb_populate_record(t, c.value -> 'changes') as r
+    )
+    from jsonb_array_elements(p_changes) as c
+    where t.id::text = c.value ->> 'id';
+
+    get diagnostics updated = row_count;
+    if updated <> jsonb_array_length(p_changes) then
+        raise exception 'bulk_update_teams: expected % rows, updated %',
+            jsonb_array_length(p_changes), updated;
+    end if;
+    return updated;
+end;
+$$;
+
+grant execute on function public.bulk_update_members(jsonb) to authenticated;
+grant execute on function public.bulk_update_teams(jsonb) to authenticated;
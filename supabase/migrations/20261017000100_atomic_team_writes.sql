@@ -0,0 +1,115 @@
+-- Atomic team creation and team-aware member saves used by helpers.create_team
+-- and helpers.save_member.
+--
+-- The pages used to count first and write afterwards, so concurrent sign-ups
+-- could overfill a team or create teams past the limit. Here the check and the
+-- write happen in one transaction, serialised on the team row (joins) or on an
+-- advisory lock (team creation). Both return {"status": ..., <row>}.
+
+create or replace function public.create_team(
+    p_team_name text,
+    p_route text,
+    p_max_teams integer default 34
+)
+returns jsonb
+language plpgsql
+security invoker
+as $$
+declare
+    team_total integer;
+    created public.teams;
+begin
+    -- One creator at a time, so the count and the insert see the same teams
+    perform pg_advisory_xact_lock(hashtext('public.create_team'));
+
+    if exists (select 1 from public.teams where team_name = p_team_name) then
+        return jsonb_build_object('status', 'duplicate', 'team', null);
+    end if;
+
+    select count(*) into team_total from public.teams;
+
+    insert into public.teams (team_name, route, on_waiting_list)
+    values (p_team_name, p_route, team_total >= p_max_teams)
+    returning * into created;
+
+    return jsonb_build_object('status', 'created', 'team', to_jsonb(created));
+end;
+$$;
+
+-- Insert (p_member_id null) or update one member from p_record. When p_record
+-- sets team_id, the team is locked and its size checked before the write.
+create or replace function public.save_member(
+    p_member_id text,
+    p_record jsonb,
+    p_max_team_members integer default 5,
+    p_allow_waiting_team boolean default true
+)
+returns jsonb
+language plpgsql
+security invoker
+as $$
+declare
+    target_team public.teams;
+    team_size integer;
+    cols text;
+    src_cols text;
+    saved public.members;
+begin
+    if p_record ->> 'team_id' is not null then
+        -- Concurrent joins to the same team queue on this row lock
+        select * into target_team
+        from public.teams
+        where id::text = p_record ->> 'team_id'
+        for update;
+
+        if not found or (target_team.on_waiting_list and not p_allow_waiting_team) then
+            return jsonb_build_object('status', 'team_unavailable', 'member', null);
+        end if;
+
+        select count(*) into team_size
+        from public.members
+        where team_id = target_team.id
+          and (p_member_id is null or id::text <> p_member_id);
+
+        if team_size >= p_max_team_members then
+            return jsonb_build_object('status', 'team_full', 'member', null);
+        end if;
+    end if;
+
+    -- Only the columns present in p_record, so inserts keep column defaults
+    select
+        string_agg(quote_ident(c.column_name), ', '),
+        string_agg('r.' || quote_ident(c.column_name), ', ')
+    into cols, src_cols
+    from information_schema.columns as c
+    where c.table_schema = 'public'
+      and c.table_name = 'members'
+      and c.column_name <> 'id'
+      and p_record ? c.column_name;
+
+    if cols is null then
+        raise exception 'save_member: no member columns in record';
+    end if;
+
+    if p_member_id is null then
+        execute format(
+            'insert into public.members (%s) select %s from jsonb_populate_record(null::public.members, $1) as r returning *',
+            cols, src_cols
+        ) into saved using p_record;
+    else
+        execute format(
+            'update public.members as m set (%s) = (select %s from jsonb_populate_record(m, $1) as r) where m.id::text = $2 returning m.*',
+            cols, src_cols
+        ) into saved using p_record, p_member_id;
+
+        if saved.id is null then
+            return jsonb_build_object('status', 'not_found', 'member', null);
+        end if;
+    end if;
+
+    return jsonb_build_object('status', 'saved', 'member', to_jsonb(saved));
+end;
+$$;
+
+grant execute on function public.create_team(text, text, integer) to authenticated;
+grant execute on function public.save_member(text, jsonb, integer, boolean) to authenticated;